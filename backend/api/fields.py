@@ -0,0 +1,93 @@
+import base64
+import binascii
+from itertools import chain
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from drf_extra_fields.fields import Base64ImageField
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import ImageField
+
+BASE64_HEADER = ";base64,"
+
+
+class ChunkedBase64ImageField(Base64ImageField):
+    CHUNK_SIZE = 64 * 1024
+    SIGNATURES = {
+        b"\xff\xd8\xff": "jpg",
+        b"\x89PNG\r\n\x1a\n": "png",
+        b"GIF87a": "gif",
+        b"GIF89a": "gif",
+    }
+    INVALID_SIZE_MESSAGE = "Размер изображения превышает {} байт."
+
+    def __init__(self, *args, max_size=None, **kwargs):
+        self.max_size = max_size or settings.RECIPE_IMAGE_MAX_SIZE
+        super().__init__(*args, **kwargs)
+
+    def get_signature_extension(self, head):
+        for signature, extension in self.SIGNATURES.items():
+            if head.startswith(signature):
+                return extension
+        raise ValidationError(self.INVALID_TYPE_MESSAGE)
+
+    def decode_chunk(self, chunk):
+        try:
+            return base64.b64decode(chunk)
+        except (TypeError, binascii.Error, ValueError):
+            raise ValidationError(self.INVALID_FILE_MESSAGE)
+
+    def iter_chunks(self, base64_data, start):
+        rest = ""
+        for position in range(start, len(base64_data), self.CHUNK_SIZE):
+            chunk = rest + "".join(
+                base64_data[position:position + self.CHUNK_SIZE].split()
+            )
+            end = len(chunk) - len(chunk) % 4
+            rest = chunk[end:]
+            if end:
+                yield self.decode_chunk(chunk[:end])
+        if rest:
+            yield self.decode_chunk(rest)
+
+    def to_internal_value(self, base64_data):
+        if base64_data in self.EMPTY_VALUES:
+            return None
+        if not isinstance(base64_data, str):
+            raise ValidationError(self.INVALID_FILE_MESSAGE)
+        start = base64_data.find(BASE64_HEADER)
+        start = 0 if start == -1 else start + len(BASE64_HEADER)
+        length = (
+            len(base64_data)
+            - start
+            - base64_data.count("\n", start)
+            - base64_data.count("\r", start)
+        )
+        if length * 3 // 4 > self.max_size + 2:
+            raise ValidationError(
+                self.INVALID_SIZE_MESSAGE.format(self.max_size)
+            )
+        chunks = self.iter_chunks(base64_data, start)
+        head = next(chunks, b"")
+        extension = self.get_signature_extension(head)
+        file = TemporaryUploadedFile(
+            name=f"{self.get_file_name(None)}.{extension}",
+            content_type=f"image/{extension}",
+            size=0,
+            charset=None,
+        )
+        try:
+            size = 0
+            for chunk in chain((head,), chunks):
+                size += len(chunk)
+                if size > self.max_size:
+                    raise ValidationError(
+                        self.INVALID_SIZE_MESSAGE.format(self.max_size)
+                    )
+                file.write(chunk)
+            file.size = size
+            file.seek(0)
+            return ImageField.to_internal_value(self, file)
+        except Exception:
+            file.close()
+            raise
@@ -1,16 +1,12 @@
 from django.contrib.auth import get_user_model
 from django_filters.rest_framework import FilterSet, filters
-from recipes.models import Ingredients, Recipe, Tag
+from recipes.models import Recipe, Tag
+from recipes.search import search_recipes
+from rest_framework.exceptions import ValidationError
 
-User = get_user_model()
-
-
-class IngredientFilter(FilterSet):
-    name = filters.CharFilter(lookup_expr="startswith")
+from .paginations import CustomCursorPagination
 
-    class Meta:
-        model = Ingredients
-        fields = ("name",)
+User = get_user_model()
 
 
 class RecipeFilter(FilterSet):
@@ -18,15 +14,37 @@ class RecipeFilter(FilterSet):
         field_name="tags__slug",
         to_field_name="slug",
         queryset=Tag.objects.all(),
+        method="filter_tags",
     )
     is_favorited = filters.BooleanFilter(method="get_favorite")
     is_in_shopping_cart = filters.BooleanFilter(
         method="get_is_in_shopping_cart"
     )
+    search = filters.CharFilter(method="filter_search")
 
     class Meta:
         model = Recipe
-        fields = ("tags", "author", "is_favorited", "is_in_shopping_cart")
+        fields = (
+            "tags",
+            "author",
+            "is_favorited",
+            "is_in_shopping_cart",
+            "search",
+        )
+
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        return queryset.with_tags(value)
+
+    def filter_search(self, queryset, name, value):
+        if not value.strip():
+            return queryset
+        if CustomCursorPagination.cursor_query_param in self.request.GET:
+            raise ValidationError(
+                {"search": "Поиск не поддерживает постраничный вывод cursor."}
+            )
+        return search_recipes(queryset, value)
 
     def get_favorite(self, queryset, name, value):
         if value:
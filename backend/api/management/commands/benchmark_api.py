@@ -0,0 +1,158 @@
+import json
+import math
+import platform
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredients, Recipe, Tag
+
+User = get_user_model()
+
+
+def percentile(values, rank):
+    ordered = sorted(values)
+    index = max(math.ceil(rank / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def get_user(username):
+    if username:
+        return User.objects.get(username=username)
+    user = (
+        User.objects.annotate(total=Count("subscriptions"))
+        .order_by("-total", "id")
+        .first()
+    )
+    if user is None:
+        raise CommandError("В базе нет пользователей.")
+    return user
+
+
+def get_endpoints(limit):
+    recipe = Recipe.objects.order_by("-id").first()
+    tag = Tag.objects.first()
+    ingredient = Ingredients.objects.first()
+    if recipe is None or tag is None or ingredient is None:
+        raise CommandError(
+            "Нет данных для замеров, выполните generate_dataset."
+        )
+    prefix = ingredient.name[:2]
+    return {
+        "tags-list": "/api/tags/",
+        "tags-detail": f"/api/tags/{tag.id}/",
+        "ingredients-list": "/api/ingredients/",
+        "ingredients-search": f"/api/ingredients/?name={prefix}",
+        "ingredients-detail": f"/api/ingredients/{ingredient.id}/",
+        "recipes-list": f"/api/recipes/?limit={limit}",
+        "recipes-list-page-10": f"/api/recipes/?limit={limit}&page=10",
+        "recipes-list-cursor": f"/api/recipes/?limit={limit}&cursor=",
+        "recipes-by-tag": f"/api/recipes/?limit={limit}&tags={tag.slug}",
+        "recipes-favorited": f"/api/recipes/?limit={limit}&is_favorited=1",
+        "recipes-in-cart": (
+            f"/api/recipes/?limit={limit}&is_in_shopping_cart=1"
+        ),
+        "recipes-detail": f"/api/recipes/{recipe.id}/",
+        "download-shopping-cart": "/api/recipes/download_shopping_cart/",
+        "users-list": f"/api/users/?limit={limit}",
+        "users-me": "/api/users/me/",
+        "users-subscriptions": (
+            f"/api/users/subscriptions/?limit={limit}&recipes_limit=3"
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = "Замеряет задержку и число запросов к БД для эндпоинтов API."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument("--limit", type=int, default=6)
+        parser.add_argument(
+            "--user",
+            type=str,
+            help="username to authenticate as "
+                 "(defaults to the user with most subscriptions)",
+        )
+        parser.add_argument("--output", type=str, help="JSON results path")
+        parser.add_argument(
+            "--baseline", type=str, help="JSON results to compare against"
+        )
+
+    @staticmethod
+    def fetch(client, url):
+        response = client.get(url)
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response
+
+    def measure(self, client, url, requests):
+        timings = []
+        queries = []
+        status_code = None
+        self.fetch(client, url)
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = self.fetch(client, url)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries.append(len(context.captured_queries))
+            status_code = response.status_code
+        return {
+            "status": status_code,
+            "p50_ms": round(percentile(timings, 50), 3),
+            "p95_ms": round(percentile(timings, 95), 3),
+            "p99_ms": round(percentile(timings, 99), 3),
+            "mean_ms": round(sum(timings) / len(timings), 3),
+            "queries": max(queries),
+        }
+
+    def handle(self, *args, **options):
+        user = get_user(options["user"])
+        token, _ = Token.objects.get_or_create(user=user)
+        client = Client(HTTP_AUTHORIZATION=f"Token {token.key}")
+        results = {}
+        for name, url in get_endpoints(options["limit"]).items():
+            results[name] = self.measure(client, url, options["requests"])
+            results[name]["url"] = url
+        report = {
+            "created": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "database": connection.vendor,
+            "requests": options["requests"],
+            "user": user.username,
+            "counts": {
+                "users": User.objects.count(),
+                "recipes": Recipe.objects.count(),
+                "ingredients": Ingredients.objects.count(),
+                "tags": Tag.objects.count(),
+            },
+            "results": results,
+        }
+        baseline = {}
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as f:
+                baseline = json.load(f)["results"]
+        self.stdout.write(
+            f"{'endpoint':28} {'p50':>9} {'p95':>9} {'p99':>9} "
+            f"{'queries':>7} {'Δp95':>8}"
+        )
+        for name, result in results.items():
+            delta = ""
+            if name in baseline and baseline[name]["p95_ms"]:
+                change = result["p95_ms"] / baseline[name]["p95_ms"] - 1
+                delta = f"{change:+.0%}"
+            self.stdout.write(
+                f"{name:28} {result['p50_ms']:9.2f} {result['p95_ms']:9.2f} "
+                f"{result['p99_ms']:9.2f} {result['queries']:7} {delta:>8}"
+            )
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
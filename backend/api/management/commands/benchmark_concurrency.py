@@ -0,0 +1,132 @@
+import json
+import platform
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from .benchmark_api import get_endpoints, get_user, percentile
+
+DEFAULT_ENDPOINTS = (
+    "tags-list",
+    "ingredients-search",
+    "recipes-list",
+    "recipes-detail",
+    "download-shopping-cart",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет пропускную способность запущенного сервера "
+        "при параллельных запросах."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            type=str,
+            default="http://localhost:8000",
+            help="base URL of the running server",
+        )
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--limit", type=int, default=6)
+        parser.add_argument(
+            "--endpoints",
+            type=str,
+            default=",".join(DEFAULT_ENDPOINTS),
+            help="comma separated endpoint names from benchmark_api",
+        )
+        parser.add_argument("--user", type=str, help="username to use")
+        parser.add_argument("--output", type=str, help="JSON results path")
+        parser.add_argument(
+            "--baseline", type=str, help="JSON results to compare against"
+        )
+
+    def measure(self, url, headers, concurrency, total):
+        local = threading.local()
+
+        def fetch(_):
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+                local.session.headers.update(headers)
+            started = time.perf_counter()
+            try:
+                response = local.session.get(url, timeout=60)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            return (time.perf_counter() - started) * 1000, ok
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(fetch, range(concurrency)))
+            started = time.perf_counter()
+            results = list(pool.map(fetch, range(total)))
+            elapsed = time.perf_counter() - started
+        timings = [timing for timing, ok in results]
+        return {
+            "rps": round(total / elapsed, 1),
+            "p50_ms": round(percentile(timings, 50), 3),
+            "p95_ms": round(percentile(timings, 95), 3),
+            "errors": sum(not ok for timing, ok in results),
+        }
+
+    def handle(self, *args, **options):
+        user = get_user(options["user"])
+        token, _ = Token.objects.get_or_create(user=user)
+        headers = {"Authorization": f"Token {token.key}"}
+        endpoints = get_endpoints(options["limit"])
+        names = options["endpoints"].split(",")
+        unknown = set(names) - endpoints.keys()
+        if unknown:
+            raise CommandError(
+                f"Неизвестные эндпоинты: {', '.join(sorted(unknown))}."
+            )
+        base_url = options["url"].rstrip("/")
+        try:
+            requests.get(f"{base_url}/api/tags/", timeout=10)
+        except requests.RequestException as error:
+            raise CommandError(f"Сервер недоступен: {error}")
+
+        results = {}
+        for name in names:
+            results[name] = self.measure(
+                base_url + endpoints[name],
+                headers,
+                options["concurrency"],
+                options["requests"],
+            )
+        report = {
+            "created": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "url": base_url,
+            "concurrency": options["concurrency"],
+            "requests": options["requests"],
+            "user": user.username,
+            "results": results,
+        }
+        baseline = {}
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as f:
+                baseline = json.load(f)["results"]
+        self.stdout.write(
+            f"{'endpoint':28} {'rps':>9} {'p50':>9} {'p95':>9} "
+            f"{'errors':>6} {'Δrps':>8}"
+        )
+        for name, result in results.items():
+            delta = ""
+            if name in baseline and baseline[name]["rps"]:
+                change = result["rps"] / baseline[name]["rps"] - 1
+                delta = f"{change:+.0%}"
+            self.stdout.write(
+                f"{name:28} {result['rps']:9.1f} {result['p50_ms']:9.2f} "
+                f"{result['p95_ms']:9.2f} {result['errors']:6} {delta:>8}"
+            )
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,58 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    quote_etag,
+)
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from recipes.cache import get_catalog_version
+
+CATALOG_RESPONSE_CACHE_KEY = "catalog_response:{}:{}:{}"
+
+
+class CachedCatalogMixin:
+    catalog = None
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        version = get_catalog_version(self.catalog)
+        key = CATALOG_RESPONSE_CACHE_KEY.format(
+            self.catalog,
+            version,
+            md5(request.get_full_path().encode()).hexdigest(),
+        )
+        cached = cache.get(key)
+        if cached is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            body = JSONRenderer().render(response.data)
+            cached = (body, quote_etag(md5(body).hexdigest()))
+            cache.set(key, cached, settings.CATALOG_CACHE_TIMEOUT)
+        body, etag = cached
+        last_modified = int(version)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = HttpResponse(body, content_type="application/json")
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
@@ -1,5 +1,24 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CustomCursorPagination(CursorPagination):
+    page_size_query_param = "limit"
+    ordering = "-id"
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = "limit"
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if CustomCursorPagination.cursor_query_param in request.query_params:
+            self.cursor_paginator = CustomCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,20 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+class ShoppingListRenderer(BaseRenderer):
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class PlainTextRenderer(ShoppingListRenderer):
+    media_type = "text/plain"
+    format = "txt"
+
+
+class CSVRenderer(ShoppingListRenderer):
+    media_type = "text/csv"
+    format = "csv"
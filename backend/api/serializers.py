@@ -1,20 +1,40 @@
+from collections import OrderedDict
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Manager
 from djoser.serializers import UserCreateSerializer, UserSerializer
-from drf_extra_fields.fields import Base64ImageField
+from recipes.cache import get_recipe_card_keys
+from recipes.similarity import METRICS, record_changes
 from recipes.models import (
     Favorite,
     Ingredients,
     AmountIngredient,
     Recipe,
+    ShoppingCartIngredient,
     ShoppingСart,
     Tag,
 )
-from rest_framework.fields import SerializerMethodField, ReadOnlyField
-from rest_framework.relations import PrimaryKeyRelatedField
-from rest_framework.serializers import ModelSerializer
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import (
+    ChoiceField,
+    IntegerField,
+    ListField,
+    ReadOnlyField,
+    SerializerMethodField,
+)
+from rest_framework.serializers import (
+    ListSerializer,
+    ModelSerializer,
+    Serializer,
+)
 
 from users.models import Subscriptions
 
+from .fields import ChunkedBase64ImageField
+
 User = get_user_model()
 
 
@@ -36,6 +56,24 @@ class CustomUserCreateSerializer(UserCreateSerializer):
         fields = ("email", "username", "first_name", "last_name", "password")
 
 
+def get_file_url(request, file):
+    if not file:
+        return None
+    if request is None:
+        return file.url
+    return request.build_absolute_uri(file.url)
+
+
+def get_subscribed_authors(request):
+    if not request.user.is_authenticated:
+        return frozenset()
+    if not hasattr(request, "subscribed_authors"):
+        request.subscribed_authors = Subscriptions.get_author_ids(
+            request.user
+        )
+    return request.subscribed_authors
+
+
 class CustomUserSerializer(UserSerializer):
     is_subscribed = SerializerMethodField(read_only=True)
 
@@ -51,11 +89,7 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        user = self.context.get("request").user
-        return (
-            user.is_authenticated
-            and Subscriptions.objects.filter(user=user, author=obj).exists()
-        )
+        return obj.pk in get_subscribed_authors(self.context.get("request"))
 
 
 class SubscriptionSerializer(ModelSerializer):
@@ -72,7 +106,7 @@ class SubscriptionSerializer(ModelSerializer):
 class SubscribeSerializer(ModelSerializer):
     is_subscribed = SerializerMethodField()
     recipes = SerializerMethodField()
-    recipes_count = SerializerMethodField()
+    recipes_count = ReadOnlyField()
 
     class Meta:
         model = User
@@ -88,13 +122,11 @@ class SubscribeSerializer(ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        user = self.context.get("request").user
-        return (
-            user.is_authenticated
-            and Subscriptions.objects.filter(user=user, author=obj).exists()
-        )
+        return obj.pk in get_subscribed_authors(self.context.get("request"))
 
     def get_recipes(self, obj):
+        if hasattr(obj, "feed_recipes"):
+            return ShortResipeSerializer(obj.feed_recipes, many=True).data
         request = self.context.get("request")
         limit = request.query_params.get("recipes_limit")
         queryset = Recipe.objects.filter(author=obj)
@@ -102,9 +134,6 @@ class SubscribeSerializer(ModelSerializer):
             queryset = queryset[: int(limit)]
         return ShortResipeSerializer(queryset, many=True).data
 
-    def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj).count()
-
 
 class RecipeIngredientSerializer(ModelSerializer):
     id = ReadOnlyField(source="ingredients.id")
@@ -116,13 +145,52 @@ class RecipeIngredientSerializer(ModelSerializer):
         fields = ("id", "name", "amount", "measurement_unit")
 
 
-class RecipeSerializer(ModelSerializer):
+class RecipeCardSerializer(ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = CustomUserSerializer(read_only=True)
     ingredients = RecipeIngredientSerializer(
         many=True,
         source="amount_ingredient"
     )
+    image = ReadOnlyField(source="image.url")
+    thumbnail = SerializerMethodField()
+    image_webp = SerializerMethodField()
+
+    class Meta:
+        model = Recipe
+        fields = (
+            "id",
+            "tags",
+            "author",
+            "ingredients",
+            "name",
+            "image",
+            "thumbnail",
+            "image_webp",
+            "text",
+            "cooking_time",
+        )
+
+    def get_thumbnail(self, obj):
+        return get_file_url(None, obj.thumbnail)
+
+    def get_image_webp(self, obj):
+        return get_file_url(None, obj.image_webp)
+
+
+class RecipeListSerializer(ListSerializer):
+    def to_representation(self, data):
+        instances = list(data.all() if isinstance(data, Manager) else data)
+        cards = self.child.get_cards(instances)
+        return [
+            self.child.get_user_representation(
+                cards[instance.pk], instance, thumbnail=True
+            )
+            for instance in instances
+        ]
+
+
+class RecipeSerializer(RecipeCardSerializer):
     is_favorited = SerializerMethodField(read_only=True)
     is_in_shopping_cart = SerializerMethodField(read_only=True)
 
@@ -137,11 +205,66 @@ class RecipeSerializer(ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "image_webp",
             "text",
             "cooking_time",
         )
+        list_serializer_class = RecipeListSerializer
+
+    def to_representation(self, instance):
+        return self.get_user_representation(
+            self.get_cards((instance,))[instance.pk], instance
+        )
+
+    def get_cards(self, instances):
+        keys = get_recipe_card_keys({instance.pk for instance in instances})
+        cached = cache.get_many(keys.values())
+        cards = {pk: cached[key] for pk, key in keys.items() if key in cached}
+        missing = keys.keys() - cards.keys()
+        if missing:
+            fresh = {
+                card["id"]: card
+                for card in RecipeCardSerializer(
+                    Recipe.objects.with_card_data().filter(pk__in=missing),
+                    many=True,
+                    context=self.context,
+                ).data
+            }
+            cache.set_many(
+                {keys[pk]: card for pk, card in fresh.items()},
+                settings.RECIPE_CARD_CACHE_TIMEOUT,
+            )
+            cards.update(fresh)
+        return cards
+
+    def get_user_representation(self, card, instance, thumbnail=False):
+        request = self.context.get("request")
+        author = dict(
+            card["author"],
+            is_subscribed=(
+                card["author"]["id"] in get_subscribed_authors(request)
+            ),
+        )
+        values = dict(
+            card,
+            author=author,
+            image=request.build_absolute_uri(
+                thumbnail and card["thumbnail"] or card["image"]
+            ),
+            image_webp=(
+                card["image_webp"]
+                and request.build_absolute_uri(card["image_webp"])
+            ),
+            is_favorited=self.get_is_favorited(instance),
+            is_in_shopping_cart=self.get_is_in_shopping_cart(instance),
+        )
+        return OrderedDict(
+            (field, values[field]) for field in self.Meta.fields
+        )
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, "is_favorited"):
+            return obj.is_favorited
         request = self.context.get("request")
         return (
             request.user.is_authenticated
@@ -150,6 +273,8 @@ class RecipeSerializer(ModelSerializer):
         )
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, "is_in_shopping_cart"):
+            return obj.is_in_shopping_cart
         request = self.context.get("request")
         return (
             request.user.is_authenticated
@@ -159,9 +284,7 @@ class RecipeSerializer(ModelSerializer):
 
 
 class RecipeIngredientCreateSerializer(ModelSerializer):
-    id = PrimaryKeyRelatedField(
-        source="ingredients", queryset=Ingredients.objects.all()
-    )
+    id = IntegerField(source="ingredients_id")
 
     class Meta:
         model = AmountIngredient
@@ -169,7 +292,8 @@ class RecipeIngredientCreateSerializer(ModelSerializer):
 
 
 class RecipeCreateSerializer(ModelSerializer):
-    image = Base64ImageField()
+    image = ChunkedBase64ImageField()
+    tags = ListField(child=IntegerField(), allow_empty=False)
     ingredients = RecipeIngredientCreateSerializer(many=True)
 
     class Meta:
@@ -183,37 +307,141 @@ class RecipeCreateSerializer(ModelSerializer):
             "cooking_time"
         )
 
+    @staticmethod
+    def get_objects(model, ids, field_name):
+        if len(set(ids)) != len(ids):
+            raise ValidationError({field_name: "Значения повторяются."})
+        objects = model.objects.in_bulk(ids)
+        missing = sorted(set(ids) - objects.keys())
+        if missing:
+            raise ValidationError(
+                {field_name: f"Объекты не найдены: {missing}."}
+            )
+        return objects
+
+    def validate(self, data):
+        if "tags" in data:
+            tags = self.get_objects(Tag, data["tags"], "tags")
+            data["tags"] = [tags[pk] for pk in data["tags"]]
+        if "ingredients" in data:
+            self.get_objects(
+                Ingredients,
+                [item["ingredients_id"] for item in data["ingredients"]],
+                "ingredients",
+            )
+        return data
+
     def create_ingredients(self, ingredient, instance):
-        for ingredient_data in ingredient:
-            AmountIngredient.objects.create(
+        AmountIngredient.objects.bulk_create(
+            AmountIngredient(
                 recipe=instance,
-                ingredients=ingredient_data["ingredients"],
+                ingredients_id=ingredient_data["ingredients_id"],
                 amount=ingredient_data["amount"],
             )
+            for ingredient_data in ingredient
+        )
 
+    def update_ingredients(self, ingredient, instance):
+        current = {
+            row.ingredients_id: row
+            for row in AmountIngredient.objects.filter(recipe=instance)
+        }
+        before = {pk: row.amount for pk, row in current.items()}
+        wanted = {
+            ingredient_data["ingredients_id"]: ingredient_data["amount"]
+            for ingredient_data in ingredient
+        }
+        changed = []
+        for pk, row in current.items():
+            if pk in wanted and row.amount != wanted[pk]:
+                row.amount = wanted[pk]
+                changed.append(row)
+        AmountIngredient.objects.filter(
+            recipe=instance, ingredients_id__in=current.keys() - wanted.keys()
+        ).delete()
+        AmountIngredient.objects.bulk_update(changed, ("amount",))
+        self.create_ingredients(
+            (
+                {"ingredients_id": pk, "amount": amount}
+                for pk, amount in wanted.items()
+                if pk not in current
+            ),
+            instance,
+        )
+        return before, wanted
+
+    @staticmethod
+    def record_ingredient_changes(instance):
+        pk = instance.pk
+        transaction.on_commit(lambda: record_changes((pk,)))
+
+    def save(self, **kwargs):
+        try:
+            return super().save(**kwargs)
+        finally:
+            image = self.validated_data.get("image")
+            if image is not None:
+                image.close()
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredient = validated_data.pop("ingredients")
         instance = super().create(validated_data)
         self.create_ingredients(ingredient, instance)
+        self.record_ingredient_changes(instance)
         return instance
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        ingredient = validated_data.pop("ingredients")
+        ingredient = validated_data.pop("ingredients", None)
         instance = super().update(instance, validated_data)
-        AmountIngredient.objects.filter(recipe=instance).delete()
-        self.create_ingredients(ingredient, instance)
+        if ingredient is not None:
+            before, after = self.update_ingredients(ingredient, instance)
+            ShoppingCartIngredient.apply_recipe_changes(
+                instance.pk, before, after
+            )
+            self.record_ingredient_changes(instance)
         return instance
 
     def to_representation(self, instance):
-        return RecipeSerializer(
-            instance, context={"request": self.context.get("request")}
-        ).data
+        request = self.context.get("request")
+        instance = Recipe.objects.with_user_flags(request.user).get(
+            pk=instance.pk
+        )
+        return RecipeSerializer(instance, context={"request": request}).data
 
 
 class ShortResipeSerializer(ModelSerializer):
+    image = SerializerMethodField()
+    image_webp = SerializerMethodField()
+
     class Meta:
         model = Recipe
-        fields = ("id", "name", "image", "cooking_time")
+        fields = ("id", "name", "image", "image_webp", "cooking_time")
+
+    def get_image(self, obj):
+        return get_file_url(
+            self.context.get("request"), obj.thumbnail or obj.image
+        )
+
+    def get_image_webp(self, obj):
+        return get_file_url(self.context.get("request"), obj.image_webp)
+
+
+class RecipeBatchSerializer(Serializer):
+    recipes = ListField(child=IntegerField(), allow_empty=False)
+
+    def validate(self, data):
+        recipes = RecipeCreateSerializer.get_objects(
+            Recipe, data["recipes"], "recipes"
+        )
+        data["recipes"] = [recipes[pk] for pk in data["recipes"]]
+        return data
+
+
+class SimilarRecipesQuerySerializer(Serializer):
+    limit = IntegerField(min_value=1, max_value=50, default=6)
+    metric = ChoiceField(choices=tuple(METRICS), default="cosine")
 
 
 class FavoriteSerializer(ModelSerializer):
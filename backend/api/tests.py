@@ -0,0 +1,533 @@
+import base64
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.cache import cache
+from django.core.cache.backends.base import (
+    InvalidCacheKey,
+    default_key_func,
+    memcache_key_warnings,
+)
+from django.db import connection
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from foodgram.middleware import connection_stats
+from recipes.models import AmountIngredient, Favorite, Ingredients, Recipe, Tag
+from recipes.search import index_recipes
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient, APITestCase
+from users.authentication import CachedTokenAuthentication
+
+from .fields import ChunkedBase64ImageField
+
+User = get_user_model()
+
+RECIPES_COUNT = 60
+
+
+def check_memcached_key(key, key_prefix, version):
+    key = default_key_func(key, key_prefix, version)
+    for warning in memcache_key_warnings(key):
+        raise InvalidCacheKey(warning)
+    return key
+
+
+class RecipeListQueriesTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="reader",
+            email="reader@example.com",
+            password="Pa55word-reader",
+        )
+        authors = [
+            User.objects.create_user(
+                username=f"author{index}",
+                email=f"author{index}@example.com",
+                password="Pa55word-author",
+            )
+            for index in range(3)
+        ]
+        tags = [
+            Tag.objects.create(
+                name=f"Тег {index}", color=f"#00000{index}", slug=f"tag{index}"
+            )
+            for index in range(3)
+        ]
+        Ingredients.objects.bulk_create(
+            Ingredients(name=f"Ингредиент {index}", measurement_unit="г")
+            for index in range(10)
+        )
+        ingredients = list(Ingredients.objects.all())
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=authors[index % len(authors)],
+                name=f"Рецепт {index}",
+                image="recipes/image/recipe.png",
+                text="Описание",
+                cooking_time=10,
+            )
+            for index in range(RECIPES_COUNT)
+        )
+        recipes = list(Recipe.objects.all())
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tag)
+            for index, recipe in enumerate(recipes)
+            for tag in tags[: 1 + index % len(tags)]
+        )
+        AmountIngredient.objects.bulk_create(
+            AmountIngredient(
+                recipe=recipe,
+                ingredients=ingredients[(index + shift) % len(ingredients)],
+                amount=10,
+            )
+            for index, recipe in enumerate(recipes)
+            for shift in range(3)
+        )
+        Favorite.objects.bulk_create(
+            Favorite(user=cls.user, recipe=recipe) for recipe in recipes[::4]
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_client(self, authenticated):
+        client = APIClient()
+        if authenticated:
+            token, _ = Token.objects.get_or_create(user=self.user)
+            client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        return client
+
+    def count_queries(self, client, limit, warm):
+        cache.clear()
+        if warm:
+            client.get(f"/api/recipes/?limit={limit}")
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(f"/api/recipes/?limit={limit}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), limit)
+        return len(context.captured_queries)
+
+    def assert_constant_queries(self, authenticated, warm):
+        client = self.get_client(authenticated)
+        expected = self.count_queries(client, 6, warm)
+        cache.clear()
+        if warm:
+            client.get("/api/recipes/?limit=50")
+        with self.assertNumQueries(expected):
+            response = client.get("/api/recipes/?limit=50")
+        self.assertEqual(len(response.data["results"]), 50)
+
+    def test_anonymous_cold_cache(self):
+        self.assert_constant_queries(authenticated=False, warm=False)
+
+    def test_anonymous_warm_cache(self):
+        self.assert_constant_queries(authenticated=False, warm=True)
+
+    def test_authenticated_cold_cache(self):
+        self.assert_constant_queries(authenticated=True, warm=False)
+
+    def test_authenticated_warm_cache(self):
+        self.assert_constant_queries(authenticated=True, warm=True)
+
+    def test_warm_cache_skips_card_queries(self):
+        client = self.get_client(authenticated=True)
+        self.assertLess(
+            self.count_queries(client, 50, warm=True),
+            self.count_queries(client, 50, warm=False),
+        )
+
+
+class IngredientCatalogCacheTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.flour = Ingredients.objects.create(
+            name="мука пшеничная", measurement_unit="г"
+        )
+        Ingredients.objects.create(name="молоко", measurement_unit="мл")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_list_is_conditional(self):
+        url = "/api/ingredients/?name=мук"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item["id"] for item in response.json()], [self.flour.pk]
+        )
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_retrieve_is_conditional(self):
+        url = f"/api/ingredients/{self.flour.pk}/"
+        response = self.client.get(url)
+        self.assertEqual(response.json()["name"], self.flour.name)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get("/api/ingredients/0/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_long_query_uses_short_cache_key(self):
+        url = f"/api/ingredients/?name={'мука' * 100}"
+        with self.settings(
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.locmem."
+                    "LocMemCache",
+                    "KEY_FUNCTION": check_memcached_key,
+                }
+            }
+        ):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate_etag(self):
+        url = "/api/ingredients/"
+        etag = self.client.get(url)["ETag"]
+        Ingredients.objects.create(name="сахар", measurement_unit="г")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 3)
+
+
+class DatabaseCheckoutTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_checkout_is_deferred_to_first_query(self):
+        etag = self.client.get("/api/tags/")["ETag"]
+        checkouts = connection_stats.checkouts
+        response = self.client.get("/api/tags/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(connection_stats.checkouts, checkouts)
+        response = self.client.get("/api/recipes/?limit=6")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(connection_stats.checkouts, checkouts + 1)
+
+
+class CachedTokenAuthenticationTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="author",
+            email="author@example.com",
+            password="Pa55word-author",
+        )
+        cls.readers = [
+            User.objects.create_user(
+                username=f"reader{index}",
+                email=f"reader{index}@example.com",
+                password="Pa55word-reader",
+            )
+            for index in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        token, _ = Token.objects.get_or_create(user=self.author)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def subscribe_readers(self):
+        for reader in self.readers:
+            client = APIClient()
+            client.force_authenticate(reader)
+            response = client.post(f"/api/users/{self.author.pk}/subscribe/")
+            self.assertEqual(response.status_code, 201)
+
+    def get_subscribers_count(self):
+        return User.objects.get(pk=self.author.pk).subscribers_count
+
+    def test_cached_user_does_not_reset_counters(self):
+        self.assertEqual(self.client.get("/api/users/me/").status_code, 200)
+        self.subscribe_readers()
+        response = self.client.post(
+            "/api/users/set_password/",
+            {
+                "current_password": "Pa55word-author",
+                "new_password": "Pa55word-changed",
+            },
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.get_subscribers_count(), 3)
+
+    def test_cached_user_profile_update_keeps_counters(self):
+        self.assertEqual(self.client.get("/api/users/me/").status_code, 200)
+        self.subscribe_readers()
+        response = self.client.patch(
+            "/api/users/me/", {"first_name": "Иван"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        author = User.objects.get(pk=self.author.pk)
+        self.assertEqual(
+            (author.first_name, author.subscribers_count), ("Иван", 3)
+        )
+
+    def test_cached_user_loads_fresh_counters(self):
+        token = Token.objects.get(user=self.author)
+        authentication = CachedTokenAuthentication()
+        authentication.authenticate_credentials(token.key)
+        self.subscribe_readers()
+        with self.assertNumQueries(0):
+            user, auth = authentication.authenticate_credentials(token.key)
+        self.assertEqual((user.pk, auth.key), (self.author.pk, token.key))
+        self.assertEqual(user.subscribers_count, 3)
+
+
+class RecipeWriteTest(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="chef", email="chef@example.com", password="Pa55word-chef"
+        )
+        cls.breakfast, cls.dinner = (
+            Tag.objects.create(name=name, color=color, slug=slug)
+            for name, color, slug in (
+                ("Завтрак", "#FF0000", "breakfast"),
+                ("Ужин", "#0000FF", "dinner"),
+            )
+        )
+        cls.flour, cls.milk, cls.eggs = (
+            Ingredients.objects.create(name=name, measurement_unit="г")
+            for name in ("мука", "молоко", "яйца")
+        )
+        buffer = BytesIO()
+        Image.new("RGB", (8, 8)).save(buffer, "PNG")
+        cls.image = "data:image/png;base64," + base64.b64encode(
+            buffer.getvalue()
+        ).decode()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.author)
+
+    def get_payload(self, **fields):
+        payload = {
+            "name": "Блины",
+            "text": "Описание",
+            "cooking_time": 30,
+            "image": self.image,
+            "tags": [self.breakfast.pk],
+            "ingredients": [
+                {"id": self.flour.pk, "amount": 200},
+                {"id": self.milk.pk, "amount": 500},
+            ],
+        }
+        payload.update(fields)
+        return payload
+
+    def create_recipe(self, **fields):
+        return self.client.post(
+            "/api/recipes/", self.get_payload(**fields), format="json"
+        )
+
+    def get_amounts(self, recipe_id):
+        return dict(
+            AmountIngredient.objects.filter(recipe_id=recipe_id)
+            .values_list("ingredients_id", "amount")
+        )
+
+    def test_create_recipe(self):
+        response = self.create_recipe()
+        self.assertEqual(response.status_code, 201)
+        recipe = Recipe.objects.get(pk=response.data["id"])
+        self.assertEqual(
+            list(recipe.tags.values_list("id", flat=True)),
+            [self.breakfast.pk],
+        )
+        self.assertEqual(
+            self.get_amounts(recipe.pk),
+            {self.flour.pk: 200, self.milk.pk: 500},
+        )
+
+    def test_create_rejects_invalid_tags(self):
+        for tags in ([], [0], [self.breakfast.pk, self.breakfast.pk]):
+            with self.subTest(tags=tags):
+                response = self.create_recipe(tags=tags)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("tags", response.data)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_create_rejects_invalid_ingredients(self):
+        for ingredients in (
+            [{"id": 0, "amount": 1}],
+            [
+                {"id": self.flour.pk, "amount": 1},
+                {"id": self.flour.pk, "amount": 2},
+            ],
+        ):
+            with self.subTest(ingredients=ingredients):
+                response = self.create_recipe(ingredients=ingredients)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("ingredients", response.data)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_update_rejects_empty_tags(self):
+        recipe_id = self.create_recipe().data["id"]
+        response = self.client.patch(
+            f"/api/recipes/{recipe_id}/", {"tags": []}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            list(
+                Recipe.objects.get(pk=recipe_id)
+                .tags.values_list("id", flat=True)
+            ),
+            [self.breakfast.pk],
+        )
+
+    def test_update_applies_ingredient_diff(self):
+        recipe_id = self.create_recipe().data["id"]
+        flour_row = AmountIngredient.objects.get(
+            recipe_id=recipe_id, ingredients=self.flour
+        )
+        response = self.client.patch(
+            f"/api/recipes/{recipe_id}/",
+            {
+                "tags": [self.dinner.pk],
+                "ingredients": [
+                    {"id": self.flour.pk, "amount": 250},
+                    {"id": self.eggs.pk, "amount": 3},
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.get_amounts(recipe_id),
+            {self.flour.pk: 250, self.eggs.pk: 3},
+        )
+        self.assertTrue(
+            AmountIngredient.objects.filter(
+                pk=flour_row.pk, amount=250
+            ).exists()
+        )
+        self.assertEqual(
+            list(
+                Recipe.objects.get(pk=recipe_id)
+                .tags.values_list("id", flat=True)
+            ),
+            [self.dinner.pk],
+        )
+
+
+class RecipeSearchTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="chef", email="chef@example.com", password="Pa55word-chef"
+        )
+        cls.salad = Recipe.objects.create(
+            author=cls.author,
+            name="Капуста тушёная",
+            image="recipes/image/recipe.png",
+            text="С морковью и луком.",
+            cooking_time=40,
+        )
+        cls.borscht = Recipe.objects.create(
+            author=cls.author,
+            name="Борщ",
+            image="recipes/image/recipe.png",
+            text="Свекла, капуста и картофель.",
+            cooking_time=90,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query):
+        response = self.client.get(f"/api/recipes/?limit=10&{query}")
+        self.assertEqual(response.status_code, 200)
+        return [recipe["id"] for recipe in response.data["results"]]
+
+    def test_search_ranks_name_matches_first(self):
+        self.assertEqual(self.search("search=борщ"), [self.borscht.pk])
+        self.assertEqual(
+            self.search("search=капуста"), [self.salad.pk, self.borscht.pk]
+        )
+
+    def test_search_finds_bulk_created_recipes(self):
+        Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    author=self.author,
+                    name="Окрошка",
+                    image="recipes/image/recipe.png",
+                    text="Холодный суп.",
+                    cooking_time=20,
+                )
+            ]
+        )
+        index_recipes(Recipe.objects.filter(name="Окрошка"))
+        self.assertEqual(len(self.search("search=окрошка")), 1)
+
+    def test_search_rejects_cursor_pagination(self):
+        response = self.client.get("/api/recipes/?search=борщ&cursor=")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("search", response.data)
+
+
+class ChunkedBase64ImageFieldTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        buffer = BytesIO()
+        Image.frombytes("RGB", (350, 350), os.urandom(350 * 350 * 3)).save(
+            buffer, "PNG"
+        )
+        cls.png = buffer.getvalue()
+
+    def decode(self, data):
+        file = ChunkedBase64ImageField().to_internal_value(data)
+        try:
+            file.seek(0)
+            return file.read()
+        finally:
+            file.close()
+
+    def test_decodes_multiple_chunks(self):
+        data = base64.b64encode(self.png).decode()
+        self.assertGreater(len(data), ChunkedBase64ImageField.CHUNK_SIZE)
+        self.assertEqual(
+            self.decode(f"data:image/png;base64,{data}"), self.png
+        )
+
+    def test_decodes_line_wrapped_data(self):
+        for data in (
+            base64.encodebytes(self.png).decode(),
+            base64.encodebytes(self.png).decode().replace("\n", "\r\n"),
+        ):
+            self.assertEqual(self.decode(data), self.png)
+
+    def test_rejects_broken_image(self):
+        data = base64.b64encode(self.png[:len(self.png) // 2]).decode()
+        with self.assertRaises((ValidationError, DjangoValidationError)):
+            ChunkedBase64ImageField().to_internal_value(data)
@@ -5,7 +5,8 @@ from api.views import (
     IngredientViewSet,
     RecipeViewSet,
     TagViewSet,
-    CustomUserViewSet
+    CustomUserViewSet,
+    database_stats,
 )
 
 app_name = "api"
@@ -21,4 +22,5 @@ router.register("users", CustomUserViewSet)
 urlpatterns = (
     path("", include(router.urls)),
     path("auth/", include("djoser.urls.authtoken")),
+    path("health/db/", database_stats, name="database-stats"),
 )
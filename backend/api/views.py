@@ -1,41 +1,62 @@
+import csv
+from itertools import chain
+
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import OuterRef, Prefetch, Subquery
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status
-from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
-from .filters import IngredientFilter, RecipeFilter
+from .filters import RecipeFilter
+from .mixins import CachedCatalogMixin
 from .paginations import CustomPagination
 from .permissions import IsAdminOrReadOnly, IsAuthorAdminOrReadOnly
+from .renderers import CSVRenderer, PlainTextRenderer
 from .serializers import (
     IngredientSerializer,
     TagSerializer,
     CustomUserSerializer,
     RecipeSerializer,
     SubscribeSerializer,
+    RecipeBatchSerializer,
     RecipeCreateSerializer,
+    ShortResipeSerializer,
     ShoppingCartSerializer,
+    SimilarRecipesQuerySerializer,
     SubscriptionSerializer,
     FavoriteSerializer,
 )
+from foodgram.middleware import connection_stats
 from users.models import Subscriptions
+from recipes.ingredient_index import IngredientIndex
+from recipes.similarity import SimilarRecipesIndex
+from recipes.user_lists import add_recipes, remove_recipes
 from recipes.models import (
     Favorite,
     Ingredients,
-    AmountIngredient,
     Recipe,
+    ShoppingCartIngredient,
     ShoppingСart,
     Tag,
 )
 
 User = get_user_model()
 
+SHOPPING_LIST_CHUNK_SIZE = 500
+
+
+class EchoBuffer:
+    def write(self, value):
+        return value
+
 
 class CustomUserViewSet(UserViewSet):
     queryset = User.objects.all()
@@ -71,10 +92,32 @@ class CustomUserViewSet(UserViewSet):
             subscription.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @staticmethod
+    def get_subscriptions_queryset(user, recipes_limit=None):
+        recipes = Recipe.objects.order_by("id")
+        if recipes_limit:
+            recipes = recipes.filter(
+                id__in=Subquery(
+                    Recipe.objects.filter(author=OuterRef("author"))
+                    .order_by("id")
+                    .values("id")[: int(recipes_limit)]
+                )
+            )
+        return (
+            User.objects.filter(subscribers__user=user)
+            .prefetch_related(
+                Prefetch(
+                    "recipe_set", queryset=recipes, to_attr="feed_recipes"
+                )
+            )
+            .order_by("username")
+        )
+
     @action(detail=False, permission_classes=[IsAuthenticated])
     def subscriptions(self, request):
-        user = request.user
-        queryset = User.objects.filter(subscribers__user=user)
+        queryset = self.get_subscriptions_queryset(
+            request.user, request.query_params.get("recipes_limit")
+        )
         pages = self.paginate_queryset(queryset)
         serializer = SubscribeSerializer(
             pages,
@@ -84,21 +127,46 @@ class CustomUserViewSet(UserViewSet):
         return self.get_paginated_response(serializer.data)
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(CachedCatalogMixin, ReadOnlyModelViewSet):
+    thread_pool_offload = True
+    catalog = "ingredients"
     queryset = Ingredients.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (IsAdminOrReadOnly,)
-    filter_backends = (DjangoFilterBackend,)
-    filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            self.list_from_index, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            self.retrieve_from_index, request, *args, **kwargs
+        )
+
+    def list_from_index(self, request, *args, **kwargs):
+        return Response(
+            IngredientIndex.get().search(request.query_params.get("name"))
+        )
+
+    def retrieve_from_index(self, request, *args, **kwargs):
+        try:
+            ingredient = IngredientIndex.get().by_id[int(kwargs["pk"])]
+        except (KeyError, ValueError):
+            raise NotFound
+        return Response(ingredient)
 
-class TagViewSet(ReadOnlyModelViewSet):
+
+class TagViewSet(CachedCatalogMixin, ReadOnlyModelViewSet):
+    thread_pool_offload = True
+    catalog = "tags"
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnly,)
 
 
 class RecipeViewSet(ModelViewSet):
+    thread_pool_offload = True
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthorAdminOrReadOnly,)
     pagination_class = CustomPagination
@@ -111,38 +179,130 @@ class RecipeViewSet(ModelViewSet):
         return RecipeCreateSerializer
 
     def get_queryset(self):
-        recipes = Recipe.objects.prefetch_related(
-            "amount_ingredient__ingredients", "tags"
-        )
-        return recipes
+        return Recipe.objects.with_user_flags(self.request.user)
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
     @staticmethod
-    def send_message(ingredients):
-        shopping_list = "Купить в магазине:"
-        for ingredient in ingredients:
-            shopping_list += (
-                f"\n{ingredient['ingredients__name']} "
-                f"({ingredient['ingredients__measurement_unit']}) - "
-                f"{ingredient['amount']}"
+    def send_message(ingredients, file_format="txt"):
+        rows = (
+            (
+                ingredient["ingredients__name"],
+                ingredient["ingredients__measurement_unit"],
+                ingredient["amount"],
+            )
+            for ingredient in ingredients.iterator(
+                chunk_size=SHOPPING_LIST_CHUNK_SIZE
             )
+        )
+        if file_format == "csv":
+            writer = csv.writer(EchoBuffer())
+            lines = chain(
+                (writer.writerow(("Ингредиент", "Единицы", "Количество")),),
+                (writer.writerow(row) for row in rows),
+            )
+            content_type = "text/csv; charset=utf-8"
+        else:
+            lines = chain(
+                ("Купить в магазине:",),
+                (
+                    f"\n{name} ({unit}) - {amount}"
+                    for name, unit, amount in rows
+                ),
+            )
+            content_type = "text/plain; charset=utf-8"
         file = "shopping_list"
-        response = HttpResponse(shopping_list, content_type="text/plain")
-        response["Content-Disposition"] = f'attachment; filename="{file}.txt"'
+        response = StreamingHttpResponse(lines, content_type=content_type)
+        response["Content-Disposition"] = (
+            f'attachment; filename="{file}.{file_format}"'
+        )
         return response
 
-    @action(detail=False, methods=["GET"])
+    @action(
+        detail=False,
+        methods=["GET"],
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(PlainTextRenderer, CSVRenderer),
+    )
     def download_shopping_cart(self, request):
         ingredients = (
-            AmountIngredient.objects.filter(
-                recipe__shopping_cart__user=request.user
-            ).order_by("ingredients__name")
-            .values("ingredients__name", "ingredients__measurement_unit")
-            .annotate(amount=Sum("amount"))
+            ShoppingCartIngredient.objects.filter(user=request.user)
+            .order_by("ingredients__name")
+            .values(
+                "ingredients__name",
+                "ingredients__measurement_unit",
+                "amount",
+            )
+        )
+        return self.send_message(
+            ingredients, request.accepted_renderer.format
+        )
+
+    @action(detail=True, methods=["GET"])
+    def similar(self, request, pk):
+        recipe = get_object_or_404(Recipe, id=pk)
+        query = SimilarRecipesQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        ranked = SimilarRecipesIndex.get().similar(
+            recipe.pk, **query.validated_data
+        )
+        recipes = Recipe.objects.in_bulk(pk for score, pk in ranked)
+        serializer = ShortResipeSerializer(
+            [recipes[pk] for score, pk in ranked if pk in recipes],
+            many=True,
+            context={"request": request},
         )
-        return self.send_message(ingredients)
+        return Response(serializer.data)
+
+    @staticmethod
+    def update_recipe_list(request, model):
+        serializer = RecipeBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipes = serializer.validated_data["recipes"]
+        recipe_ids = [recipe.pk for recipe in recipes]
+        with transaction.atomic():
+            if request.method == "POST":
+                add_recipes(model, request.user, recipe_ids)
+            else:
+                remove_recipes(model, request.user, recipe_ids)
+        if request.method == "POST":
+            return Response(
+                ShortResipeSerializer(
+                    recipes, many=True, context={"request": request}
+                ).data,
+                status=status.HTTP_201_CREATED,
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(
+        detail=False,
+        methods=["post", "delete"],
+        url_path="favorite",
+        permission_classes=(IsAuthenticated,),
+    )
+    def favorite_batch(self, request):
+        return self.update_recipe_list(request, Favorite)
+
+    @action(
+        detail=False,
+        methods=["post", "delete"],
+        url_path="shopping_cart",
+        permission_classes=(IsAuthenticated,),
+    )
+    def shopping_cart_batch(self, request):
+        return self.update_recipe_list(request, ShoppingСart)
+
+    @action(
+        detail=False,
+        methods=["delete"],
+        url_path="shopping_cart/clear",
+        permission_classes=(IsAuthenticated,),
+    )
+    def clear_shopping_cart(self, request):
+        with transaction.atomic():
+            remove_recipes(ShoppingСart, request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
         detail=True,
@@ -197,3 +357,9 @@ class RecipeViewSet(ModelViewSet):
             )
             is_shopping_cart.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(("GET",))
+@permission_classes((IsAdminUser,))
+def database_stats(request):
+    return Response(connection_stats.as_dict())
@@ -3,14 +3,21 @@ ASGI config for foodgram project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Read-only requests to views marked with ``thread_pool_offload`` run in a
+bounded thread pool instead of the single thread Django 3.2 uses for all
+synchronous views.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 """
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+django.setup(set_prefix=False)
+
+from foodgram.handlers import ThreadPoolASGIHandler  # noqa: E402
 
-application = get_asgi_application()
+application = ThreadPoolASGIHandler()
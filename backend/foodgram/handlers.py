@@ -0,0 +1,132 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections, connections
+
+from .middleware import DatabaseCheckoutMiddleware
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASGI_THREADS, thread_name_prefix="orm"
+)
+
+
+def prepare_connections(request):
+    close_old_connections()
+    DatabaseCheckoutMiddleware.defer_checkout(
+        connections["default"], request
+    )
+
+
+def run_view(view, request, *args, **kwargs):
+    prepare_connections(request)
+    with ExitStack() as stack:
+        timings = getattr(request, "server_timings", None)
+        if timings is not None:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings))
+        response = view(request, *args, **kwargs)
+    response.thread_pool_request = request
+    return response
+
+
+def produce_content(loop, queue, stopped, request, content):
+    def put(item):
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    try:
+        prepare_connections(request)
+        for chunk in content:
+            put(chunk)
+            if stopped.is_set():
+                break
+    except Exception as error:
+        put(error)
+    finally:
+        close = getattr(content, "close", None)
+        if close is not None:
+            close()
+        put(StopAsyncIteration())
+
+
+async def stream_content(request, content):
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=settings.ASGI_STREAM_BUFFER)
+    stopped = threading.Event()
+    producer = loop.run_in_executor(
+        executor,
+        contextvars.copy_context().run,
+        partial(produce_content, loop, queue, stopped, request, content),
+    )
+    try:
+        while True:
+            item = await queue.get()
+            if isinstance(item, StopAsyncIteration):
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stopped.set()
+        while not producer.done():
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.wait((producer,), timeout=0.01)
+
+
+class ThreadPoolASGIHandler(ASGIHandler):
+    async def send_response(self, response, send):
+        request = getattr(response, "thread_pool_request", None)
+        if request is None or not response.streaming:
+            return await super().send_response(response, send)
+        content = stream_content(request, response.streaming_content)
+        response.streaming_content = ()
+
+        async def send_with_content(message):
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body"
+            ):
+                async for part in content:
+                    for chunk, _ in self.chunk_bytes(part):
+                        await send(
+                            {
+                                "type": "http.response.body",
+                                "body": chunk,
+                                "more_body": True,
+                            }
+                        )
+            await send(message)
+
+        try:
+            await super().send_response(response, send_with_content)
+        finally:
+            await content.aclose()
+
+    def make_view_atomic(self, view):
+        view_class = getattr(view, "cls", None)
+        view = super().make_view_atomic(view)
+        if not getattr(view_class, "thread_pool_offload", False):
+            return view
+
+        @wraps(view)
+        async def offloaded_view(request, *args, **kwargs):
+            if request.method not in SAFE_METHODS:
+                return await sync_to_async(view, thread_sensitive=True)(
+                    request, *args, **kwargs
+                )
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                executor,
+                contextvars.copy_context().run,
+                partial(run_view, view, request, *args, **kwargs),
+            )
+
+        return offloaded_view
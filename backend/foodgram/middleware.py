@@ -0,0 +1,181 @@
+import logging
+import os
+import threading
+import time
+import weakref
+from contextlib import ExitStack
+from functools import partial
+
+from django.conf import settings
+from django.db import connections
+from django.utils.deprecation import MiddlewareMixin
+
+logger = logging.getLogger("foodgram.sql")
+
+
+class ConnectionStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.wrappers = weakref.WeakSet()
+        self.checkouts = 0
+        self.reused = 0
+        self.opened = 0
+        self.health_check_failures = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def record(self, connection, reused, failed, wait_time):
+        with self.lock:
+            self.wrappers.add(connection)
+            self.checkouts += 1
+            self.reused += reused
+            self.opened += not reused
+            self.health_check_failures += failed
+            self.wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                "pid": os.getpid(),
+                "pool_size": sum(
+                    wrapper.connection is not None
+                    for wrapper in self.wrappers
+                ),
+                "checkouts": self.checkouts,
+                "reused": self.reused,
+                "opened": self.opened,
+                "health_check_failures": self.health_check_failures,
+                "wait_ms_total": round(self.wait_time * 1000, 1),
+                "wait_ms_avg": round(
+                    self.wait_time * 1000 / (self.checkouts or 1), 2
+                ),
+                "wait_ms_max": round(self.max_wait_time * 1000, 1),
+            }
+
+
+connection_stats = ConnectionStats()
+
+
+class DatabaseCheckoutMiddleware(MiddlewareMixin):
+    def process_request(self, request):
+        self.defer_checkout(connections["default"], request)
+
+    @classmethod
+    def defer_checkout(cls, connection, request):
+        if not hasattr(connection, "pending_checkout"):
+            connection._cursor = partial(
+                cls.checkout_cursor, connection, connection._cursor
+            )
+        connection.pending_checkout = request
+
+    @classmethod
+    def checkout_cursor(cls, connection, create_cursor, *args, **kwargs):
+        request = connection.pending_checkout
+        if request is not None:
+            connection.pending_checkout = None
+            request.db_checkout_time = cls.checkout(connection)
+        return create_cursor(*args, **kwargs)
+
+    @staticmethod
+    def checkout(connection):
+        started = time.perf_counter()
+        reused = connection.connection is not None
+        failed = False
+        if (
+            reused
+            and settings.DB_CONN_HEALTH_CHECKS
+            and not connection.in_atomic_block
+            and not connection.is_usable()
+        ):
+            connection.close()
+            reused = False
+            failed = True
+        connection.ensure_connection()
+        wait_time = time.perf_counter() - started
+        connection_stats.record(connection, reused, failed, wait_time)
+        return wait_time
+
+
+class RequestTimings:
+    def __init__(self):
+        self.queries = []
+        self.started = time.perf_counter()
+        self.wrappers = ExitStack()
+        self.view_name = None
+        self.view_started = None
+        self.view_finished = None
+        self.view_db_time = 0.0
+
+    @property
+    def db_time(self):
+        return sum(duration for duration, sql in self.queries)
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((time.perf_counter() - started, sql))
+
+
+class ServerTimingMiddleware(MiddlewareMixin):
+    def process_request(self, request):
+        timings = request.server_timings = RequestTimings()
+        for connection in connections.all():
+            timings.wrappers.enter_context(connection.execute_wrapper(timings))
+
+    def process_response(self, request, response):
+        timings = request.server_timings
+        timings.wrappers.close()
+        total = time.perf_counter() - timings.started
+        metrics = [
+            f'db;dur={timings.db_time * 1000:.1f};'
+            f'desc="{len(timings.queries)} queries"'
+        ]
+        checkout = getattr(request, "db_checkout_time", None)
+        if checkout is not None:
+            metrics.append(f"db-checkout;dur={checkout * 1000:.1f}")
+        if timings.view_finished is not None:
+            view_time = timings.view_finished - timings.view_started
+            metrics.append(
+                "serialize;dur="
+                f"{(view_time - timings.view_db_time) * 1000:.1f}"
+            )
+            render = time.perf_counter() - timings.view_finished
+            metrics.append(f"render;dur={render * 1000:.1f}")
+        metrics.append(f"total;dur={total * 1000:.1f}")
+        response["Server-Timing"] = ", ".join(metrics)
+        self.log_slow_queries(timings)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = request.server_timings
+        view_class = getattr(view_func, "cls", None)
+        if view_class is None:
+            timings.view_name = view_func.__name__
+        else:
+            action = getattr(view_func, "actions", {}).get(
+                request.method.lower(), request.method.lower()
+            )
+            timings.view_name = f"{view_class.__name__}.{action}"
+        timings.view_started = time.perf_counter()
+        timings.view_db_time = timings.db_time
+
+    def process_template_response(self, request, response):
+        timings = request.server_timings
+        timings.view_finished = time.perf_counter()
+        timings.view_db_time = timings.db_time - timings.view_db_time
+        return response
+
+    @staticmethod
+    def log_slow_queries(timings):
+        threshold = settings.SERVER_TIMING_SLOW_QUERY_MS / 1000
+        slow = sorted(
+            (query for query in timings.queries if query[0] >= threshold),
+            reverse=True,
+        )
+        for duration, sql in slow[:settings.SERVER_TIMING_SLOW_QUERY_LOG]:
+            logger.warning(
+                "%s: %.1f ms %s", timings.view_name, duration * 1000, sql
+            )
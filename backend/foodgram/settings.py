@@ -40,6 +40,7 @@ LOCAL_APPS = [
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    'foodgram.middleware.DatabaseCheckoutMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -49,6 +50,20 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+SERVER_TIMING = os.getenv('SERVER_TIMING', default='False') == 'True'
+SERVER_TIMING_SLOW_QUERY_MS = float(
+    os.getenv('SERVER_TIMING_SLOW_QUERY_MS', default=100)
+)
+SERVER_TIMING_SLOW_QUERY_LOG = int(
+    os.getenv('SERVER_TIMING_SLOW_QUERY_LOG', default=3)
+)
+
+if SERVER_TIMING:
+    MIDDLEWARE.insert(0, 'foodgram.middleware.ServerTimingMiddleware')
+
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', default=8))
+ASGI_STREAM_BUFFER = int(os.getenv('ASGI_STREAM_BUFFER', default=8))
+
 ROOT_URLCONF = 'foodgram.urls'
 
 TEMPLATES_DIR = BASE_DIR / 'templates'
@@ -77,10 +92,55 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default=5432)
+        'PORT': os.getenv('DB_PORT', default=5432),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv(
+            'DB_DISABLE_SERVER_SIDE_CURSORS', default='False'
+        ) == 'True',
+    }
+}
+
+DB_CONN_HEALTH_CHECKS = os.getenv(
+    'DB_CONN_HEALTH_CHECKS', default='True'
+) == 'True'
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
     }
 }
 
+AUTH_TOKEN_CACHE_TIMEOUT = int(
+    os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', default=60 * 5)
+)
+
+SUBSCRIBED_AUTHORS_CACHE_TIMEOUT = int(
+    os.getenv('SUBSCRIBED_AUTHORS_CACHE_TIMEOUT', default=60)
+)
+
+CATALOG_CACHE_TIMEOUT = int(
+    os.getenv('CATALOG_CACHE_TIMEOUT', default=60 * 60 * 24)
+)
+
+RECIPE_CARD_CACHE_TIMEOUT = int(
+    os.getenv('RECIPE_CARD_CACHE_TIMEOUT', default=60 * 60)
+)
+
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', default=2))
+
+RECIPE_THUMBNAIL_SIZE = (
+    int(os.getenv('RECIPE_THUMBNAIL_WIDTH', default=480)),
+    int(os.getenv('RECIPE_THUMBNAIL_HEIGHT', default=480)),
+)
+
+RECIPE_IMAGE_MAX_SIZE = int(
+    os.getenv('RECIPE_IMAGE_MAX_SIZE', default=10 * 1024 * 1024)
+)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -102,7 +162,7 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
 }
 
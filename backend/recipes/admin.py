@@ -1,35 +1,50 @@
 from django.contrib import admin
 from django.contrib.admin import display
+from django.db import transaction
 
 from .models import (
     Favorite,
     Ingredients,
     Recipe,
+    ShoppingCartIngredient,
     ShoppingСart,
     Tag,
     AmountIngredient
 )
+from .similarity import record_changes
 
 
 class IngredientsInLine(admin.TabularInline):
     model = AmountIngredient
     extra = 1
+    autocomplete_fields = ("ingredients",)
 
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ("name", "id", "author", "added_in_favorite")
+    list_select_related = ("author",)
     search_fields = ("name", "author__username")
-    list_filter = (
-        "author",
-        "name",
-        "tags",
-    )
+    list_filter = ("tags",)
+    autocomplete_fields = ("author", "tags")
+    show_full_result_count = False
     inlines = (IngredientsInLine,)
 
-    @display(description="Количество в избранных")
+    @display(
+        description="Количество в избранных", ordering="favorites_count"
+    )
     def added_in_favorite(self, obj):
-        return obj.favorite.count()
+        return obj.favorites_count
+
+    def save_related(self, request, form, formsets, change):
+        pk = form.instance.pk
+        before = ShoppingCartIngredient.recipe_amounts((pk,)) if change else {}
+        super().save_related(request, form, formsets, change)
+        if change:
+            ShoppingCartIngredient.apply_recipe_changes(
+                pk, before, ShoppingCartIngredient.recipe_amounts((pk,))
+            )
+        transaction.on_commit(lambda: record_changes((pk,)))
 
 
 @admin.register(Ingredients)
@@ -39,7 +54,7 @@ class IngredientsAdmin(admin.ModelAdmin):
         "measurement_unit",
     )
     search_fields = ("name",)
-    list_filter = ("name",)
+    list_filter = ("measurement_unit",)
 
 
 @admin.register(Tag)
@@ -59,6 +74,9 @@ class CartsAdmin(admin.ModelAdmin):
         "recipe",
     )
     search_fields = ("user__username", "user__email")
+    list_select_related = ("user", "recipe")
+    autocomplete_fields = ("user", "recipe")
+    show_full_result_count = False
 
 
 @admin.register(Favorite)
@@ -68,3 +86,6 @@ class FavoritesAdmin(admin.ModelAdmin):
         "recipe",
     )
     search_fields = ("user__username", "user__email")
+    list_select_related = ("user", "recipe")
+    autocomplete_fields = ("user", "recipe")
+    show_full_result_count = False
@@ -0,0 +1,32 @@
+import time
+
+from django.core.cache import cache
+
+CATALOG_VERSION_KEY = "catalog_version:{}"
+RECIPE_CARD_CACHE_KEY = "recipe_card:{}:{}:{}"
+
+
+def get_catalog_version(catalog):
+    key = CATALOG_VERSION_KEY.format(catalog)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time(), None)
+        version = cache.get(key)
+    return version
+
+
+def touch_catalog(catalog):
+    cache.set(CATALOG_VERSION_KEY.format(catalog), time.time(), None)
+
+
+def get_recipe_card_keys(pks):
+    tags_version = get_catalog_version("tags")
+    ingredients_version = get_catalog_version("ingredients")
+    return {
+        pk: RECIPE_CARD_CACHE_KEY.format(pk, tags_version, ingredients_version)
+        for pk in pks
+    }
+
+
+def invalidate_recipe_cards(pks):
+    cache.delete_many(get_recipe_card_keys(pks).values())
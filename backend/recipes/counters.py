@@ -0,0 +1,58 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from users.models import Subscriptions
+
+from .models import Favorite, Recipe, ShoppingСart
+
+User = get_user_model()
+
+COUNTERS = (
+    (Recipe, "favorites_count", Favorite, "recipe"),
+    (Recipe, "in_shopping_cart_count", ShoppingСart, "recipe"),
+    (User, "recipes_count", Recipe, "author"),
+    (User, "subscribers_count", Subscriptions, "author"),
+)
+
+
+def change_counter(model, pks, field, delta):
+    model.objects.filter(pk__in=pks).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+def update_counters(sender, instance, delta):
+    for model, field, related, fk in COUNTERS:
+        if related is sender:
+            change_counter(
+                model, (getattr(instance, f"{fk}_id"),), field, delta
+            )
+
+
+def get_expected_count(related, fk):
+    return Coalesce(
+        Subquery(
+            related.objects.filter(**{fk: OuterRef("pk")})
+            .order_by()
+            .values(fk)
+            .annotate(total=Count("pk"))
+            .values("total"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def get_drift(model, field, related, fk):
+    return (
+        model.objects.annotate(expected=get_expected_count(related, fk))
+        .exclude(**{field: F("expected")})
+        .order_by()
+    )
+
+
+def reconcile_counter(model, field, related, fk):
+    return get_drift(model, field, related, fk).update(
+        **{field: get_expected_count(related, fk)}
+    )
@@ -0,0 +1,84 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from .cache import invalidate_recipe_cards
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DIR = "recipes/thumbnails/"
+
+executor = ThreadPoolExecutor(
+    max_workers=max(settings.RECIPE_IMAGE_WORKERS, 1),
+    thread_name_prefix="recipe-images",
+)
+
+
+def get_variant_names(image_name):
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return (
+        f"{THUMBNAIL_DIR}{stem}.jpg",
+        f"{THUMBNAIL_DIR}{stem}.webp",
+    )
+
+
+def needs_variants(recipe):
+    if not recipe.image:
+        return False
+    return recipe.thumbnail.name != get_variant_names(recipe.image.name)[0]
+
+
+def schedule_variants(recipe_id):
+    if settings.RECIPE_IMAGE_WORKERS:
+        transaction.on_commit(lambda: executor.submit(run_task, recipe_id))
+    else:
+        transaction.on_commit(lambda: build_variants_safely(recipe_id))
+
+
+def run_task(recipe_id):
+    try:
+        build_variants_safely(recipe_id)
+    finally:
+        connection.close()
+
+
+def build_variants_safely(recipe_id):
+    try:
+        build_variants(recipe_id)
+    except Exception:
+        logger.exception("Не удалось подготовить изображения %s", recipe_id)
+
+
+def save_variant(image, name, image_format, **options):
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def build_variants(recipe_id):
+    recipe = Recipe.objects.only("image").filter(pk=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return
+    thumbnail_name, webp_name = get_variant_names(recipe.image.name)
+    with recipe.image.open("rb") as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image.thumbnail(settings.RECIPE_THUMBNAIL_SIZE)
+        image = image.convert("RGB")
+    thumbnail_name = save_variant(
+        image, thumbnail_name, "JPEG", quality=85, optimize=True
+    )
+    webp_name = save_variant(image, webp_name, "WEBP", quality=80)
+    Recipe.objects.filter(pk=recipe_id, image=recipe.image.name).update(
+        thumbnail=thumbnail_name, image_webp=webp_name
+    )
+    invalidate_recipe_cards((recipe_id,))
@@ -0,0 +1,59 @@
+import threading
+from bisect import bisect_left
+
+from .cache import get_catalog_version, touch_catalog
+from .models import Ingredients
+
+
+def normalize(value):
+    return value.casefold().replace("ё", "е")
+
+
+class IngredientIndex:
+    _instance = None
+    _version = None
+    _lock = threading.Lock()
+
+    def __init__(self, rows):
+        records = sorted(
+            (normalize(name), pk, name, measurement_unit)
+            for pk, name, measurement_unit in rows
+        )
+        self.keys = [record[0] for record in records]
+        self.records = [
+            {"id": pk, "name": name, "measurement_unit": measurement_unit}
+            for _, pk, name, measurement_unit in records
+        ]
+        self.by_id = {record["id"]: record for record in self.records}
+
+    def search(self, query):
+        query = normalize(query or "")
+        if not query:
+            return self.records
+        start = bisect_left(self.keys, query)
+        end = bisect_left(self.keys, query + chr(0x10FFFF), start)
+        contains = [
+            record
+            for key, record in zip(self.keys, self.records)
+            if query in key and not key.startswith(query)
+        ]
+        return self.records[start:end] + contains
+
+    @classmethod
+    def get(cls):
+        version = get_catalog_version("ingredients")
+        if cls._instance is None or cls._version != version:
+            with cls._lock:
+                if cls._instance is None or cls._version != version:
+                    cls._instance = cls(
+                        Ingredients.objects.values_list(
+                            "id", "name", "measurement_unit"
+                        )
+                    )
+                    cls._version = version
+        return cls._instance
+
+    @classmethod
+    def invalidate(cls):
+        touch_catalog("ingredients")
+        cls._instance = None
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import build_variants_safely, needs_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Создаёт миниатюры и WebP-версии изображений рецептов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="rebuild variants for every recipe",
+        )
+
+    def handle(self, *args, **options):
+        built = 0
+        recipes = Recipe.objects.only("image", "thumbnail").iterator()
+        for recipe in recipes:
+            if options["all"] or needs_variants(recipe):
+                build_variants_safely(recipe.pk)
+                built += 1
+        self.stdout.write(f"Обработано рецептов: {built}")
@@ -0,0 +1,141 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from recipes.models import (
+    AmountIngredient,
+    Favorite,
+    Recipe,
+    ShoppingCartIngredient,
+    ShoppingСart,
+    Tag,
+)
+from users.models import Subscriptions
+
+User = get_user_model()
+
+PAGE_SIZE = 6
+LARGE_TABLES = frozenset(
+    model._meta.db_table
+    for model in (
+        Recipe,
+        Recipe.tags.through,
+        AmountIngredient,
+        Favorite,
+        ShoppingСart,
+        ShoppingCartIngredient,
+        Subscriptions,
+    )
+)
+
+
+def get_plan(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def get_full_scans(node):
+    scans = []
+    relation = node.get("Relation Name")
+    if relation in LARGE_TABLES and (
+        node["Node Type"] == "Seq Scan"
+        or "Filter" in node and "Index Cond" not in node
+    ):
+        scans.append(f"{node['Node Type']} on {relation}")
+    for child in node.get("Plans", ()):
+        scans.extend(get_full_scans(child))
+    return scans
+
+
+def analyze_tables():
+    with connection.cursor() as cursor:
+        for table in sorted(LARGE_TABLES):
+            cursor.execute(f"ANALYZE {connection.ops.quote_name(table)}")
+
+
+def get_hot_queries(user):
+    recipe_ids = list(
+        Recipe.objects.values_list("id", flat=True)[:PAGE_SIZE]
+    )
+    return {
+        "recipe feed": Recipe.objects.with_user_flags(user)[:PAGE_SIZE],
+        "author feed": Recipe.objects.filter(author=user)[:PAGE_SIZE],
+        "tag filter": Recipe.objects.with_tags(
+            Tag.objects.values("id")[:2]
+        )[:PAGE_SIZE],
+        "favorites filter": Recipe.objects.filter(
+            favorite__user=user
+        )[:PAGE_SIZE],
+        "shopping cart filter": Recipe.objects.filter(
+            shopping_cart__user=user
+        )[:PAGE_SIZE],
+        "recipe ingredients": AmountIngredient.objects.select_related(
+            "ingredients"
+        ).filter(recipe_id__in=recipe_ids).order_by("id"),
+        "recipe tags": Recipe.tags.through.objects.filter(
+            recipe_id__in=recipe_ids
+        ),
+        "shopping list": ShoppingCartIngredient.objects.filter(
+            user=user
+        ).values("ingredients__name", "amount"),
+        "subscribed authors": Subscriptions.objects.filter(
+            user=user
+        ).values_list("author_id", flat=True),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Проверяет планы горячих запросов и завершается ошибкой, "
+        "если большая таблица читается целиком."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--show-plans",
+            action="store_true",
+            help="print the full EXPLAIN output for every query",
+        )
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="refresh planner statistics of the large tables first",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError(
+                f"Проверка планов для {connection.vendor} не поддерживается."
+            )
+        user = User.objects.order_by("id").first()
+        if user is None:
+            raise CommandError(
+                "База пуста, выполните generate_dataset."
+            )
+
+        if options["analyze"]:
+            analyze_tables()
+        failures = []
+        for name, queryset in get_hot_queries(user).items():
+            scanned = sorted(set(get_full_scans(get_plan(queryset))))
+            if scanned:
+                failures.append(name)
+                self.stdout.write(
+                    f"{name}: полное сканирование {', '.join(scanned)}"
+                )
+            else:
+                self.stdout.write(f"{name}: OK")
+            if options["show_plans"] or scanned:
+                self.stdout.write(queryset.explain())
+
+        if failures:
+            raise CommandError(
+                f"Запросы без индекса: {', '.join(failures)}."
+            )
@@ -0,0 +1,198 @@
+import random
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from PIL import Image
+
+from recipes.models import (
+    AmountIngredient,
+    Favorite,
+    Ingredients,
+    Recipe,
+    ShoppingСart,
+    Tag,
+)
+from recipes.search import index_recipes
+from users.models import Subscriptions
+
+User = get_user_model()
+
+BATCH_SIZE = 1000
+IMAGE_NAME = "recipes/image/synthetic.png"
+
+
+class Command(BaseCommand):
+    help = "Генерирует синтетический набор данных для нагрузочных замеров."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--recipes", type=int, default=1000)
+        parser.add_argument("--tags", type=int, default=10)
+        parser.add_argument("--ingredients-per-recipe", type=int, default=8)
+        parser.add_argument("--favorites-per-user", type=int, default=20)
+        parser.add_argument("--carts-per-user", type=int, default=5)
+        parser.add_argument("--subscriptions-per-user", type=int, default=10)
+        parser.add_argument("--prefix", type=str, default="bench")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="delete previously generated users and their data first",
+        )
+
+    def handle(self, *args, **options):
+        prefix = options["prefix"]
+        rng = random.Random(options["seed"])
+        ingredient_ids = list(Ingredients.objects.values_list("id", flat=True))
+        if not ingredient_ids:
+            raise CommandError(
+                "Каталог ингредиентов пуст, выполните loadmodels."
+            )
+        if options["clear"]:
+            User.objects.filter(username__startswith=f"{prefix}_").delete()
+        elif User.objects.filter(username__startswith=f"{prefix}_").exists():
+            raise CommandError(
+                f"Пользователи с префиксом {prefix}_ уже есть, "
+                "используйте --clear или другой --prefix."
+            )
+
+        with transaction.atomic():
+            tag_ids = self.create_tags(options["tags"])
+            user_ids = self.create_users(prefix, options["users"])
+            recipe_ids = self.create_recipes(
+                rng, user_ids, options["recipes"]
+            )
+            self.create_recipe_links(
+                rng,
+                recipe_ids,
+                tag_ids,
+                ingredient_ids,
+                options["ingredients_per_recipe"],
+            )
+            for model, per_user in (
+                (Favorite, options["favorites_per_user"]),
+                (ShoppingСart, options["carts_per_user"]),
+            ):
+                model.objects.bulk_create(
+                    (
+                        model(user_id=user_id, recipe_id=recipe_id)
+                        for user_id in user_ids
+                        for recipe_id in rng.sample(
+                            recipe_ids, min(per_user, len(recipe_ids))
+                        )
+                    ),
+                    batch_size=BATCH_SIZE,
+                )
+            Subscriptions.objects.bulk_create(
+                (
+                    Subscriptions(user_id=user_id, author_id=author_id)
+                    for user_id in user_ids
+                    for author_id in rng.sample(
+                        user_ids,
+                        min(options["subscriptions_per_user"] + 1,
+                            len(user_ids)),
+                    )
+                    if author_id != user_id
+                ),
+                batch_size=BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+            index_recipes(Recipe.objects.filter(pk__in=recipe_ids))
+        call_command("rebuild_shopping_lists", stdout=self.stdout)
+        call_command("reconcile_counters", stdout=self.stdout)
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+        self.stdout.write(
+            f"Создано: пользователей {len(user_ids)}, "
+            f"рецептов {len(recipe_ids)}, тегов {len(tag_ids)}."
+        )
+
+    def create_tags(self, count):
+        existing = Tag.objects.count()
+        Tag.objects.bulk_create(
+            Tag(
+                name=f"Тег {number}",
+                color=f"#{number:06x}",
+                slug=f"tag-{number}",
+            )
+            for number in range(existing, count)
+        )
+        return list(Tag.objects.values_list("id", flat=True))
+
+    def create_users(self, prefix, count):
+        password = make_password(f"{prefix}-password")
+        User.objects.bulk_create(
+            (
+                User(
+                    username=f"{prefix}_{number}",
+                    email=f"{prefix}_{number}@example.com",
+                    first_name="Имя",
+                    last_name="Фамилия",
+                    password=password,
+                )
+                for number in range(count)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        return list(
+            User.objects.filter(username__startswith=f"{prefix}_")
+            .values_list("id", flat=True)
+        )
+
+    def create_recipes(self, rng, user_ids, count):
+        if not default_storage.exists(IMAGE_NAME):
+            buffer = BytesIO()
+            Image.new("RGB", (640, 480), "#a87d32").save(buffer, "PNG")
+            default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+        Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    author_id=rng.choice(user_ids),
+                    name=f"Рецепт {number}",
+                    image=IMAGE_NAME,
+                    text="Синтетический рецепт для нагрузочных замеров.",
+                    cooking_time=rng.randint(5, 180),
+                )
+                for number in range(count)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        return list(
+            Recipe.objects.filter(author_id__in=user_ids)
+            .values_list("id", flat=True)
+        )
+
+    def create_recipe_links(
+        self, rng, recipe_ids, tag_ids, ingredient_ids, per_recipe
+    ):
+        Recipe.tags.through.objects.bulk_create(
+            (
+                Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                for recipe_id in recipe_ids
+                for tag_id in rng.sample(
+                    tag_ids, min(rng.randint(1, 3), len(tag_ids))
+                )
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        AmountIngredient.objects.bulk_create(
+            (
+                AmountIngredient(
+                    recipe_id=recipe_id,
+                    ingredients_id=ingredient_id,
+                    amount=rng.randint(1, 500),
+                )
+                for recipe_id in recipe_ids
+                for ingredient_id in rng.sample(
+                    ingredient_ids, min(per_recipe, len(ingredient_ids))
+                )
+            ),
+            batch_size=BATCH_SIZE,
+        )
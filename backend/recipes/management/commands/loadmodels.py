@@ -1,35 +1,116 @@
+import csv
 import json
+import time
+from itertools import chain, islice
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
+from recipes.cache import touch_catalog
+from recipes.ingredient_index import IngredientIndex
 from recipes.models import Ingredients, Tag
 
+CATALOGS = {
+    "tags": (Tag, ("name", "color", "slug")),
+    "ingredients": (Ingredients, ("name", "measurement_unit")),
+}
+CSV_FIELDS = {len(fields): fields for model, fields in CATALOGS.values()}
+
+
+def iter_json(file, chunk_size=64 * 1024):
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith("["):
+        raise CommandError("Ожидался JSON-массив.")
+    buffer = buffer[1:]
+    eof = False
+    while True:
+        buffer = buffer.lstrip().lstrip(",").lstrip()
+        if buffer.startswith("]"):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise CommandError("Некорректный JSON.")
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def iter_csv(file):
+    for row in csv.reader(file):
+        if not row:
+            continue
+        fields = CSV_FIELDS.get(len(row))
+        if fields is None:
+            raise CommandError(f"Неизвестный формат строки: {row}")
+        if row != list(fields):
+            yield dict(zip(fields, row))
+
+
+def get_catalog(row):
+    for catalog, (model, fields) in CATALOGS.items():
+        if set(row) == set(fields):
+            return catalog
+    raise CommandError(f"Неизвестный формат записи: {row}")
+
 
 class Command(BaseCommand):
+    help = "Загружает теги или ингредиенты из JSON- или CSV-файла."
 
     def add_arguments(self, parser):
         parser.add_argument("--path", type=str, help="file path")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="rows per INSERT statement",
+        )
 
     def handle(self, *args, **options):
         file_path = options["path"]
+        batch_size = options["batch_size"]
+        started = time.monotonic()
+
+        with open(file_path, encoding="utf-8", newline="") as f:
+            if file_path.endswith(".csv"):
+                rows = iter_csv(f)
+            else:
+                rows = iter_json(f)
+            first = next(rows, None)
+            if first is None:
+                self.stdout.write("Файл пуст.")
+                return
+            catalog = get_catalog(first)
+            model, fields = CATALOGS[catalog]
+            rows = chain((first,), rows)
+            read = 0
+            with transaction.atomic():
+                before = model.objects.count()
+                while True:
+                    batch = list(islice(rows, batch_size))
+                    if not batch:
+                        break
+                    read += len(batch)
+                    model.objects.bulk_create(
+                        (
+                            model(**{field: row[field] for field in fields})
+                            for row in batch
+                        ),
+                        ignore_conflicts=True,
+                    )
+                created = model.objects.count() - before
 
-        with open(file_path, encoding='utf-8') as f:
-            jsondata = json.load(f)
-            if 'color' in jsondata[0]:
-                for line in jsondata:
-                    if not Tag.objects.filter(
-                       slug=line['slug']).exists():
-                        Tag.objects.create(
-                            name=line['name'],
-                            color=line['color'],
-                            slug=line['slug'],
-                        )
-            elif 'measurement_unit' in jsondata[0]:
-                for line in jsondata:
-                    if not Ingredients.objects.filter(
-                       name=line['name'],
-                       measurement_unit=line['measurement_unit']).exists():
-                        Ingredients.objects.create(
-                            name=line['name'],
-                            measurement_unit=line['measurement_unit']
-                        )
+        if catalog == "ingredients":
+            IngredientIndex.invalidate()
+        else:
+            touch_catalog(catalog)
+        self.stdout.write(
+            f"{model._meta.verbose_name_plural}: прочитано {read}, "
+            f"добавлено {created}, пропущено {read - created} "
+            f"за {time.monotonic() - started:.2f} с."
+        )
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+
+from recipes.models import AmountIngredient, ShoppingCartIngredient
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает списки покупок пользователей по их корзинам."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="only report drift, do not rewrite the table",
+        )
+
+    def handle(self, *args, **options):
+        expected = {
+            (row["recipe__shopping_cart__user"], row["ingredients"]):
+            row["amount"]
+            for row in AmountIngredient.objects.filter(
+                recipe__shopping_cart__isnull=False
+            ).order_by()
+            .values("recipe__shopping_cart__user", "ingredients")
+            .annotate(amount=Sum("amount"))
+            .filter(amount__gt=0)
+        }
+        actual = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in (
+                ShoppingCartIngredient.objects.order_by().values_list(
+                    "user", "ingredients", "amount"
+                )
+            )
+        }
+        drift = [
+            key for key in expected.keys() | actual.keys()
+            if expected.get(key) != actual.get(key)
+        ]
+        self.stdout.write(f"Расхождений: {len(drift)}")
+        if options["check"]:
+            if drift:
+                raise CommandError("Списки покупок не согласованы.")
+            return
+        with transaction.atomic():
+            ShoppingCartIngredient.objects.all().delete()
+            ShoppingCartIngredient.objects.bulk_create(
+                (
+                    ShoppingCartIngredient(
+                        user_id=user_id,
+                        ingredients_id=ingredient_id,
+                        amount=amount,
+                    )
+                    for (user_id, ingredient_id), amount in expected.items()
+                ),
+                batch_size=1000,
+            )
+        self.stdout.write(f"Записано строк: {len(expected)}")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.counters import COUNTERS, get_drift, reconcile_counter
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики избранного, корзин, рецептов и подписчиков."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="only report drift, do not update the counters",
+        )
+
+    def handle(self, *args, **options):
+        drift = 0
+        with transaction.atomic():
+            for counter in COUNTERS:
+                model, field, related, fk = counter
+                if options["check"]:
+                    count = get_drift(*counter).count()
+                else:
+                    count = reconcile_counter(*counter)
+                drift += count
+                self.stdout.write(
+                    f"{model.__name__}.{field}: расхождений {count}"
+                )
+        if options["check"] and drift:
+            raise CommandError("Счётчики не согласованы.")
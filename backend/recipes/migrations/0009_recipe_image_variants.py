@@ -0,0 +1,23 @@
+# Generated by Django 3.2 on 2026-10-18 04:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_shoppingcartingredient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_webp',
+            field=models.ImageField(blank=True, editable=False, upload_to='recipes/thumbnails/', verbose_name='Миниатюра блюда в WebP'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to='recipes/thumbnails/', verbose_name='Миниатюра блюда'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 3.2 on 2026-10-18 04:22
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+COUNTERS = (
+    ('recipes', 'Recipe', 'favorites_count', 'recipes', 'Favorite', 'recipe'),
+    (
+        'recipes',
+        'Recipe',
+        'in_shopping_cart_count',
+        'recipes',
+        'ShoppingСart',
+        'recipe',
+    ),
+    ('users', 'User', 'recipes_count', 'recipes', 'Recipe', 'author'),
+    (
+        'users',
+        'User',
+        'subscribers_count',
+        'users',
+        'Subscriptions',
+        'author',
+    ),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for app, model_name, field, related_app, related_name, fk in COUNTERS:
+        model = apps.get_model(app, model_name)
+        related = apps.get_model(related_app, related_name)
+        total = models.Subquery(
+            related.objects.filter(**{fk: models.OuterRef('pk')})
+            .order_by()
+            .values(fk)
+            .annotate(total=models.Count('pk'))
+            .values('total'),
+            output_field=models.IntegerField(),
+        )
+        model.objects.update(**{field: Coalesce(total, 0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_hot_path_indexes'),
+        ('users', '0003_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество в избранных'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_shopping_cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество в списках покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,21 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import RegexValidator
 from django.db import models
+from django.db.models import (
+    BooleanField,
+    Case,
+    Exists,
+    F,
+    OuterRef,
+    Prefetch,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Greatest
+
+from users.models import CounterFieldsMixin
 
 User = get_user_model()
 
@@ -62,7 +77,45 @@ class Ingredients(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    def with_card_data(self):
+        return self.select_related("author").prefetch_related(
+            "tags",
+            Prefetch(
+                "amount_ingredient",
+                queryset=AmountIngredient.objects.select_related(
+                    "ingredients"
+                ).order_by("id"),
+            ),
+        )
+
+    def with_tags(self, tags):
+        return self.filter(
+            Exists(
+                Recipe.tags.through.objects.filter(
+                    recipe=OuterRef("pk"), tag__in=tags
+                )
+            )
+        )
+
+    def with_user_flags(self, user):
+        if not user.is_authenticated:
+            false = Value(False, output_field=BooleanField())
+            return self.annotate(
+                is_favorited=false,
+                is_in_shopping_cart=false,
+            )
+        return self.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingСart.objects.filter(user=user, recipe=OuterRef("pk"))
+            ),
+        )
+
+
+class Recipe(CounterFieldsMixin, models.Model):
     author = models.ForeignKey(
         User,
         verbose_name="Автор рецепта",
@@ -72,6 +125,18 @@ class Recipe(models.Model):
     image = models.ImageField(
         verbose_name="Изображения блюда", upload_to="recipes/image/"
     )
+    thumbnail = models.ImageField(
+        verbose_name="Миниатюра блюда",
+        upload_to="recipes/thumbnails/",
+        blank=True,
+        editable=False,
+    )
+    image_webp = models.ImageField(
+        verbose_name="Миниатюра блюда в WebP",
+        upload_to="recipes/thumbnails/",
+        blank=True,
+        editable=False,
+    )
     text = models.TextField(
         verbose_name="Описание",
     )
@@ -87,17 +152,35 @@ class Recipe(models.Model):
     cooking_time = models.PositiveSmallIntegerField(
         verbose_name="Время готовки", default=0
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name="Количество в избранных", default=0, editable=False
+    )
+    in_shopping_cart_count = models.PositiveIntegerField(
+        verbose_name="Количество в списках покупок",
+        default=0,
+        editable=False,
+    )
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+    counter_fields = ("favorites_count", "in_shopping_cart_count")
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
-        ordering = ("author",)
+        ordering = ("-id",)
         constraints = [
             models.UniqueConstraint(
                 fields=("name", "author"),
                 name="unique_for_author",
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=("author", "-id"),
+                name="recipe_author_feed_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -161,6 +244,12 @@ class Favorite(models.Model):
                 name="unique_favorite_recipe_for_user",
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=("user", "recipe"),
+                name="favorite_user_recipe_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.user} -> {self.recipe}"
@@ -192,6 +281,111 @@ class ShoppingСart(models.Model):
                 name="unique_cart_user",
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=("user", "recipe"),
+                name="cart_user_recipe_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.user} -> {self.recipe}"
+
+
+class ShoppingCartIngredient(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name="Владелец списка",
+        related_name="shopping_cart_ingredients",
+        on_delete=models.CASCADE,
+    )
+    ingredients = models.ForeignKey(
+        Ingredients,
+        verbose_name="Ингредиент",
+        on_delete=models.CASCADE,
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name="Общее количество",
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = "Ингредиент в списке покупок"
+        verbose_name_plural = "Ингредиенты в списке покупок"
+        ordering = ("user", "ingredients__name")
+        constraints = [
+            models.UniqueConstraint(
+                fields=(
+                    "user",
+                    "ingredients",
+                ),
+                name="unique_cart_ingredient_user",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user} -> {self.ingredients}: {self.amount}"
+
+    @classmethod
+    def apply_amounts(cls, user_ids, amounts, sign=1):
+        deltas = {
+            ingredient_id: sign * amount
+            for ingredient_id, amount in amounts.items()
+            if amount
+        }
+        if not user_ids or not deltas:
+            return
+        cls.objects.bulk_create(
+            [
+                cls(user_id=user_id, ingredients_id=ingredient_id)
+                for user_id in user_ids
+                for ingredient_id, delta in deltas.items()
+                if delta > 0
+            ],
+            ignore_conflicts=True,
+        )
+        rows = cls.objects.filter(
+            user_id__in=user_ids, ingredients_id__in=deltas
+        )
+        delta = Case(
+            *(
+                When(ingredients_id=ingredient_id, then=Value(delta))
+                for ingredient_id, delta in deltas.items()
+            ),
+            output_field=models.IntegerField(),
+        )
+        rows.update(amount=Greatest(F("amount") + delta, Value(0)))
+        if any(delta < 0 for delta in deltas.values()):
+            rows.filter(amount__lte=0).delete()
+
+    @classmethod
+    def add_recipes(cls, user_ids, recipe_ids):
+        cls.apply_amounts(user_ids, cls.recipe_amounts(recipe_ids))
+
+    @classmethod
+    def remove_recipes(cls, user_ids, recipe_ids):
+        cls.apply_amounts(user_ids, cls.recipe_amounts(recipe_ids), sign=-1)
+
+    @classmethod
+    def apply_recipe_changes(cls, recipe_id, before, after):
+        cls.apply_amounts(
+            list(
+                ShoppingСart.objects.filter(recipe_id=recipe_id)
+                .values_list("user_id", flat=True)
+            ),
+            {
+                ingredient_id: after.get(ingredient_id, 0)
+                - before.get(ingredient_id, 0)
+                for ingredient_id in before.keys() | after.keys()
+            },
+        )
+
+    @staticmethod
+    def recipe_amounts(recipe_ids):
+        return dict(
+            AmountIngredient.objects.filter(recipe_id__in=recipe_ids)
+            .order_by()
+            .values("ingredients_id")
+            .annotate(total=Sum("amount"))
+            .values_list("ingredients_id", "total")
+        )
@@ -0,0 +1,121 @@
+import re
+import threading
+from bisect import bisect_left
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import connections
+from django.db.models import Case, F, FloatField, Value, When
+
+from .cache import get_catalog_version, touch_catalog
+from .ingredient_index import normalize
+from .models import Recipe
+
+SEARCH_CONFIG = "russian"
+FIELD_WEIGHTS = (("name", "A", 1.0), ("text", "B", 0.4))
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(value):
+    return TOKEN_PATTERN.findall(normalize(value or ""))
+
+
+def get_search_vector():
+    vector = None
+    for field, weight, _ in FIELD_WEIGHTS:
+        part = SearchVector(field, weight=weight, config=SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def index_recipes(queryset):
+    if connections[queryset.db].vendor == "postgresql":
+        queryset.update(search_vector=get_search_vector())
+    else:
+        RecipeSearchIndex.invalidate()
+
+
+def index_recipe(pk, using):
+    index_recipes(Recipe.objects.using(using).filter(pk=pk))
+
+
+def search_recipes(queryset, query):
+    if connections[queryset.db].vendor == "postgresql":
+        search_query = SearchQuery(query, config=SEARCH_CONFIG)
+        return (
+            queryset.filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F("search_vector"), search_query))
+            .order_by("-rank", "-id")
+        )
+    ranks = RecipeSearchIndex.get().search(query)
+    return (
+        queryset.filter(pk__in=ranks)
+        .annotate(
+            rank=Case(
+                *(
+                    When(pk=pk, then=Value(rank))
+                    for pk, rank in ranks.items()
+                ),
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+        )
+        .order_by("-rank", "-id")
+    )
+
+
+class RecipeSearchIndex:
+    _instance = None
+    _version = None
+    _lock = threading.Lock()
+
+    def __init__(self, rows):
+        postings = {}
+        for pk, *values in rows:
+            for value, (_, _, weight) in zip(values, FIELD_WEIGHTS):
+                for token in tokenize(value):
+                    matches = postings.setdefault(token, {})
+                    matches[pk] = matches.get(pk, 0.0) + weight
+        self.tokens = sorted(postings)
+        self.postings = postings
+
+    def search(self, query):
+        ranks = None
+        for term in tokenize(query):
+            start = bisect_left(self.tokens, term)
+            end = bisect_left(self.tokens, term + chr(0x10FFFF), start)
+            matches = {}
+            for token in self.tokens[start:end]:
+                for pk, weight in self.postings[token].items():
+                    matches[pk] = matches.get(pk, 0.0) + weight
+            if ranks is None:
+                ranks = matches
+            else:
+                ranks = {
+                    pk: ranks[pk] + weight
+                    for pk, weight in matches.items()
+                    if pk in ranks
+                }
+        return ranks or {}
+
+    @classmethod
+    def get(cls):
+        version = get_catalog_version("recipes")
+        if cls._instance is None or cls._version != version:
+            with cls._lock:
+                if cls._instance is None or cls._version != version:
+                    cls._instance = cls(
+                        Recipe.objects.order_by().values_list(
+                            "id", *(field for field, _, _ in FIELD_WEIGHTS)
+                        )
+                    )
+                    cls._version = version
+        return cls._instance
+
+    @classmethod
+    def invalidate(cls):
+        touch_catalog("recipes")
+        cls._instance = None
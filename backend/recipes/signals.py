@@ -0,0 +1,110 @@
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from users.models import Subscriptions
+
+from .cache import invalidate_recipe_cards, touch_catalog
+from .counters import update_counters
+from .images import needs_variants, schedule_variants
+from .ingredient_index import IngredientIndex
+from .models import (
+    Favorite,
+    Ingredients,
+    Recipe,
+    ShoppingCartIngredient,
+    ShoppingСart,
+    Tag,
+)
+from .search import RecipeSearchIndex, index_recipe
+from .similarity import record_changes
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=ShoppingСart)
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        ShoppingCartIngredient.add_recipes(
+            (instance.user_id,), (instance.recipe_id,)
+        )
+
+
+@receiver(pre_delete, sender=ShoppingСart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    ShoppingCartIngredient.remove_recipes(
+        (instance.user_id,), (instance.recipe_id,)
+    )
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingСart)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Subscriptions)
+def increment_counters(sender, instance, created, **kwargs):
+    if created:
+        update_counters(sender, instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingСart)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Subscriptions)
+def decrement_counters(sender, instance, **kwargs):
+    update_counters(sender, instance, -1)
+
+
+@receiver(post_save, sender=Ingredients)
+@receiver(post_delete, sender=Ingredients)
+def reset_ingredient_index(sender, **kwargs):
+    IngredientIndex.invalidate()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def reset_tags_catalog(sender, **kwargs):
+    touch_catalog("tags")
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def reset_recipe_card(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: invalidate_recipe_cards((pk,)))
+
+
+@receiver(post_save, sender=Recipe)
+def update_search_index(sender, instance, using, update_fields=None, **kwargs):
+    if update_fields is not None and not {"name", "text"} & set(update_fields):
+        return
+    index_recipe(instance.pk, using)
+
+
+@receiver(post_delete, sender=Recipe)
+def reset_search_index(sender, using, **kwargs):
+    if connections[using].vendor != "postgresql":
+        RecipeSearchIndex.invalidate()
+
+
+@receiver(post_delete, sender=Recipe)
+def reset_similar_recipes(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: record_changes((pk,)))
+
+
+@receiver(post_save, sender=Recipe)
+def build_recipe_images(sender, instance, **kwargs):
+    if needs_variants(instance):
+        schedule_variants(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def reset_author_recipe_cards(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    pks = list(
+        Recipe.objects.filter(author=instance).values_list("pk", flat=True)
+    )
+    if pks:
+        transaction.on_commit(lambda: invalidate_recipe_cards(pks))
@@ -0,0 +1,156 @@
+import copy
+import threading
+
+import numpy as np
+from django.core.cache import cache
+
+from .models import AmountIngredient
+
+CHANGES_SEQUENCE_KEY = "similar_recipes:sequence"
+CHANGE_KEY = "similar_recipes:change:{}"
+CHANGE_TIMEOUT = 60 * 60 * 24
+MAX_PENDING_CHANGES = 1000
+
+
+def cosine(overlap, size, other_size):
+    return overlap / np.sqrt(size * other_size)
+
+
+def jaccard(overlap, size, other_size):
+    return overlap / (size + other_size - overlap)
+
+
+METRICS = {"cosine": cosine, "jaccard": jaccard}
+
+
+def get_sequence():
+    cache.add(CHANGES_SEQUENCE_KEY, 0, None)
+    return cache.get(CHANGES_SEQUENCE_KEY, 0)
+
+
+def record_changes(recipe_ids):
+    cache.add(CHANGES_SEQUENCE_KEY, 0, None)
+    for pk in recipe_ids:
+        try:
+            sequence = cache.incr(CHANGES_SEQUENCE_KEY)
+        except ValueError:
+            cache.add(CHANGES_SEQUENCE_KEY, 0, None)
+            continue
+        cache.set(CHANGE_KEY.format(sequence), pk, CHANGE_TIMEOUT)
+
+
+def load_rows(recipe_ids=None):
+    amounts = AmountIngredient.objects.order_by()
+    if recipe_ids is not None:
+        amounts = amounts.filter(recipe_id__in=recipe_ids)
+    rows = {}
+    for recipe_id, ingredient_id in amounts.values_list(
+        "recipe_id", "ingredients_id"
+    ).iterator():
+        rows.setdefault(recipe_id, set()).add(ingredient_id)
+    return rows
+
+
+class SimilarRecipesIndex:
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, rows, sequence):
+        self.rows = {}
+        self.columns = {}
+        self.sizes = np.zeros(max(rows, default=0) + 1, dtype=np.int64)
+        self.sequence = sequence
+        self.update_rows(rows)
+
+    def update_rows(self, rows):
+        if rows and max(rows) >= len(self.sizes):
+            sizes = np.zeros(max(rows) * 2 + 1, dtype=np.int64)
+            sizes[:len(self.sizes)] = self.sizes
+            self.sizes = sizes
+        added = {}
+        removed = {}
+        for pk, ingredients in rows.items():
+            old = self.rows.get(pk, frozenset())
+            new = frozenset(ingredients)
+            for ingredient_id in old - new:
+                removed.setdefault(ingredient_id, []).append(pk)
+            for ingredient_id in new - old:
+                added.setdefault(ingredient_id, []).append(pk)
+            if new:
+                self.rows[pk] = new
+            else:
+                self.rows.pop(pk, None)
+            self.sizes[pk] = len(new)
+        for ingredient_id in added.keys() | removed.keys():
+            column = self.columns.get(ingredient_id)
+            if column is None:
+                column = np.empty(0, dtype=np.int64)
+            if ingredient_id in removed:
+                column = np.setdiff1d(column, removed[ingredient_id])
+            if ingredient_id in added:
+                column = np.union1d(column, added[ingredient_id])
+            self.columns[ingredient_id] = column
+
+    def copy(self):
+        index = copy.copy(self)
+        index.rows = dict(self.rows)
+        index.columns = dict(self.columns)
+        index.sizes = self.sizes.copy()
+        return index
+
+    def catch_up(self, sequence):
+        if sequence == self.sequence:
+            return self
+        if not 0 < sequence - self.sequence <= MAX_PENDING_CHANGES:
+            return None
+        keys = [
+            CHANGE_KEY.format(number)
+            for number in range(self.sequence + 1, sequence + 1)
+        ]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys):
+            return None
+        rows = dict.fromkeys(changes.values(), ())
+        rows.update(load_rows(rows.keys()))
+        index = self.copy()
+        index.update_rows(rows)
+        index.sequence = sequence
+        return index
+
+    def similar(self, pk, limit, metric="cosine"):
+        ingredients = self.rows.get(pk)
+        if not ingredients:
+            return []
+        columns = [
+            self.columns[ingredient_id] for ingredient_id in ingredients
+        ]
+        sizes = self.sizes
+        overlaps = np.bincount(np.concatenate(columns))
+        overlaps[pk] = 0
+        candidates = np.flatnonzero(overlaps)
+        candidates = candidates[sizes[candidates] > 0]
+        scores = METRICS[metric](
+            overlaps[candidates], len(ingredients), sizes[candidates]
+        )
+        if len(candidates) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            candidates, scores = candidates[top], scores[top]
+        order = np.lexsort((-candidates, -scores))
+        return [
+            (float(scores[index]), int(candidates[index])) for index in order
+        ]
+
+    @classmethod
+    def get(cls):
+        sequence = get_sequence()
+        instance = cls._instance
+        if instance is not None and instance.sequence == sequence:
+            return instance
+        with cls._lock:
+            instance = cls._instance
+            if instance is not None:
+                instance = instance.catch_up(sequence)
+            if instance is None:
+                instance = cls(load_rows(), sequence)
+            cls._instance = instance
+            return instance
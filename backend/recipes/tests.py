@@ -0,0 +1,300 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from users.models import Subscriptions
+
+from .models import (
+    AmountIngredient,
+    Favorite,
+    Ingredients,
+    Recipe,
+    ShoppingCartIngredient,
+    ShoppingСart,
+    Tag,
+)
+from .similarity import SimilarRecipesIndex, get_sequence, record_changes
+from .user_lists import add_recipes, remove_recipes
+
+User = get_user_model()
+
+
+class RecipeAdminShoppingCartTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username="admin",
+            email="admin@example.com",
+            password="Pa55word-admin",
+        )
+        cls.buyer = User.objects.create_user(
+            username="buyer",
+            email="buyer@example.com",
+            password="Pa55word-buyer",
+        )
+        cls.tag = Tag.objects.create(
+            name="Обед", color="#000000", slug="lunch"
+        )
+        cls.flour, cls.milk, cls.eggs = (
+            Ingredients.objects.create(name=name, measurement_unit="г")
+            for name in ("мука", "молоко", "яйца")
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.admin,
+            name="Блины",
+            image="recipes/image/recipe.png",
+            text="Описание",
+            cooking_time=30,
+        )
+        cls.recipe.tags.set((cls.tag,))
+        cls.flour_row = AmountIngredient.objects.create(
+            recipe=cls.recipe, ingredients=cls.flour, amount=200
+        )
+        cls.milk_row = AmountIngredient.objects.create(
+            recipe=cls.recipe, ingredients=cls.milk, amount=500
+        )
+        add_recipes(ShoppingСart, cls.buyer, (cls.recipe.pk,))
+
+    def get_cart(self):
+        return dict(
+            ShoppingCartIngredient.objects.filter(user=self.buyer)
+            .values_list("ingredients_id", "amount")
+        )
+
+    def test_inline_changes_update_shopping_carts(self):
+        self.client.force_login(self.admin)
+        prefix = "amount_ingredient"
+        response = self.client.post(
+            reverse("admin:recipes_recipe_change", args=(self.recipe.pk,)),
+            {
+                "author": self.admin.pk,
+                "name": self.recipe.name,
+                "text": self.recipe.text,
+                "tags": (self.tag.pk,),
+                "cooking_time": self.recipe.cooking_time,
+                f"{prefix}-TOTAL_FORMS": 3,
+                f"{prefix}-INITIAL_FORMS": 2,
+                f"{prefix}-MIN_NUM_FORMS": 0,
+                f"{prefix}-MAX_NUM_FORMS": 1000,
+                f"{prefix}-0-id": self.flour_row.pk,
+                f"{prefix}-0-recipe": self.recipe.pk,
+                f"{prefix}-0-ingredients": self.flour.pk,
+                f"{prefix}-0-amount": 250,
+                f"{prefix}-1-id": self.milk_row.pk,
+                f"{prefix}-1-recipe": self.recipe.pk,
+                f"{prefix}-1-ingredients": self.milk.pk,
+                f"{prefix}-1-amount": 500,
+                f"{prefix}-1-DELETE": "on",
+                f"{prefix}-2-recipe": self.recipe.pk,
+                f"{prefix}-2-ingredients": self.eggs.pk,
+                f"{prefix}-2-amount": 3,
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            self.get_cart(), {self.flour.pk: 250, self.eggs.pk: 3}
+        )
+
+
+class UserListsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="cook", email="cook@example.com", password="Pa55word-cook"
+        )
+        cls.salt = Ingredients.objects.create(
+            name="соль", measurement_unit="г"
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.user,
+                name=f"Рецепт {number}",
+                image="recipes/image/recipe.png",
+                text="Описание",
+                cooking_time=10,
+            )
+            for number in range(3)
+        ]
+        for recipe in cls.recipes:
+            AmountIngredient.objects.create(
+                recipe=recipe, ingredients=cls.salt, amount=5
+            )
+
+    def get_counts(self, field):
+        return [
+            getattr(recipe, field)
+            for recipe in Recipe.objects.order_by("id")
+        ]
+
+    def test_add_counts_only_inserted_rows(self):
+        first, second, third = (recipe.pk for recipe in self.recipes)
+        Favorite.objects.create(user=self.user, recipe_id=first)
+        added = add_recipes(Favorite, self.user, [first, second, third])
+        self.assertCountEqual(added, [second, third])
+        self.assertEqual(self.get_counts("favorites_count"), [1, 1, 1])
+        self.assertEqual(add_recipes(Favorite, self.user, [second]), [])
+        self.assertEqual(self.get_counts("favorites_count"), [1, 1, 1])
+
+    def test_remove_and_clear_shopping_cart(self):
+        first, second, third = (recipe.pk for recipe in self.recipes)
+        add_recipes(ShoppingСart, self.user, [first, second, third])
+        removed = remove_recipes(ShoppingСart, self.user, [first, 0])
+        self.assertEqual(removed, [first])
+        self.assertEqual(
+            self.get_counts("in_shopping_cart_count"), [0, 1, 1]
+        )
+        self.assertEqual(
+            ShoppingCartIngredient.objects.get(user=self.user).amount, 10
+        )
+        self.assertCountEqual(
+            remove_recipes(ShoppingСart, self.user), [second, third]
+        )
+        self.assertEqual(self.get_counts("in_shopping_cart_count"), [0, 0, 0])
+        self.assertFalse(
+            ShoppingCartIngredient.objects.filter(user=self.user).exists()
+        )
+
+
+class CounterFieldsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username="cook", email="cook@example.com", password="Pa55word-cook"
+        )
+        cls.reader = User.objects.create_user(
+            username="reader",
+            email="reader@example.com",
+            password="Pa55word-reader",
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author,
+            name="Блины",
+            image="recipes/image/recipe.png",
+            text="Описание",
+            cooking_time=30,
+        )
+
+    def test_save_keeps_concurrent_counter_updates(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        author = User.objects.get(pk=self.author.pk)
+        add_recipes(Favorite, self.reader, (recipe.pk,))
+        Subscriptions.objects.create(author=author, user=self.reader)
+        recipe.name = "Оладьи"
+        recipe.save()
+        author.first_name = "Иван"
+        author.save()
+        recipe.refresh_from_db()
+        author.refresh_from_db()
+        self.assertEqual(
+            (recipe.name, recipe.favorites_count), ("Оладьи", 1)
+        )
+        self.assertEqual(author.first_name, "Иван")
+        self.assertEqual(
+            (author.recipes_count, author.subscribers_count), (1, 1)
+        )
+
+    def test_save_of_deferred_instance(self):
+        recipe = Recipe.objects.only("name").get(pk=self.recipe.pk)
+        recipe.name = "Оладьи"
+        recipe.save()
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.assertEqual((recipe.name, recipe.text), ("Оладьи", "Описание"))
+
+
+class SimilarRecipesIndexTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username="cook", email="cook@example.com", password="Pa55word-cook"
+        )
+        cls.ingredients = [
+            Ingredients.objects.create(name=name, measurement_unit="г")
+            for name in ("мука", "молоко", "яйца", "сахар")
+        ]
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.user,
+                name=f"Рецепт {number}",
+                image="recipes/image/recipe.png",
+                text="Описание",
+                cooking_time=10,
+            )
+            for number in range(3)
+        ]
+        for recipe, ingredients in zip(
+            cls.recipes, ((0, 1, 2), (0, 1), (3,))
+        ):
+            for index in ingredients:
+                AmountIngredient.objects.create(
+                    recipe=recipe,
+                    ingredients=cls.ingredients[index],
+                    amount=1,
+                )
+
+    def setUp(self):
+        cache.clear()
+        SimilarRecipesIndex._instance = None
+
+    def tearDown(self):
+        SimilarRecipesIndex._instance = None
+
+    def test_changes_are_applied_to_a_copy(self):
+        first, second, third = (recipe.pk for recipe in self.recipes)
+        index = SimilarRecipesIndex.get()
+        before = index.similar(first, 10)
+        self.assertEqual([pk for _, pk in before], [second])
+        AmountIngredient.objects.create(
+            recipe=self.recipes[2], ingredients=self.ingredients[0], amount=1
+        )
+        record_changes((third,))
+        updated = SimilarRecipesIndex.get()
+        self.assertIsNot(updated, index)
+        self.assertEqual(updated.sequence, get_sequence())
+        self.assertEqual(
+            [pk for _, pk in updated.similar(first, 10)], [second, third]
+        )
+        self.assertEqual(index.similar(first, 10), before)
+        self.assertEqual(index.rows[third], {self.ingredients[3].pk})
+        self.assertIs(SimilarRecipesIndex.get(), updated)
+
+
+@skipUnless(
+    connection.vendor == "postgresql", "EXPLAIN checks need PostgreSQL"
+)
+class HotQueryPlansTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredients.objects.bulk_create(
+            Ingredients(name=f"Ингредиент {number}", measurement_unit="г")
+            for number in range(500)
+        )
+        call_command(
+            "generate_dataset",
+            users=100,
+            recipes=3000,
+            stdout=StringIO(),
+        )
+
+    def test_hot_queries_use_indexes(self):
+        call_command("explain_hot_queries", stdout=StringIO())
@@ -0,0 +1,69 @@
+from django.db import connection
+
+from .counters import COUNTERS, change_counter
+from .models import Recipe, ShoppingCartIngredient, ShoppingСart
+
+
+def change_recipe_counters(model, recipe_ids, delta):
+    for counted, field, related, fk in COUNTERS:
+        if counted is Recipe and related is model:
+            change_counter(Recipe, recipe_ids, field, delta)
+
+
+def get_columns(model):
+    quote_name = connection.ops.quote_name
+    return (
+        quote_name(model._meta.db_table),
+        quote_name(model._meta.get_field("user").column),
+        quote_name(model._meta.get_field("recipe").column),
+    )
+
+
+def add_recipes(model, user, recipe_ids):
+    if not recipe_ids:
+        return []
+    table, user_column, recipe_column = get_columns(model)
+    values = ", ".join(("(%s, %s)",) * len(recipe_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({user_column}, {recipe_column}) "
+            f"VALUES {values} ON CONFLICT DO NOTHING "
+            f"RETURNING {recipe_column}",
+            [value for pk in recipe_ids for value in (user.pk, pk)],
+        )
+        added = [pk for pk, in cursor.fetchall()]
+    if added:
+        change_recipe_counters(model, added, 1)
+        if model is ShoppingСart:
+            ShoppingCartIngredient.add_recipes((user.pk,), added)
+    return added
+
+
+def remove_recipes(model, user, recipe_ids=None):
+    table, user_column, recipe_column = get_columns(model)
+    condition = f"{user_column} = %s"
+    params = [user.pk]
+    if recipe_ids is not None:
+        if not recipe_ids:
+            return []
+        condition += (
+            f" AND {recipe_column} IN "
+            f"({', '.join(('%s',) * len(recipe_ids))})"
+        )
+        params.extend(recipe_ids)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table} WHERE {condition} "
+            f"RETURNING {recipe_column}",
+            params,
+        )
+        removed = [pk for pk, in cursor.fetchall()]
+    if not removed:
+        return removed
+    change_recipe_counters(model, removed, -1)
+    if model is ShoppingСart:
+        if recipe_ids is None:
+            ShoppingCartIngredient.objects.filter(user=user).delete()
+        else:
+            ShoppingCartIngredient.remove_recipes((user.pk,), removed)
+    return removed
@@ -12,8 +12,10 @@ class UserAdmin(UserAdmin):
         "email",
         "first_name",
         "last_name",
+        "recipes_count",
+        "subscribers_count",
     )
-    list_filter = ("email", "first_name")
+    list_filter = ("is_staff", "is_active")
 
 
 @admin.register(Subscriptions)
@@ -22,3 +24,7 @@ class SubscribeAdmin(admin.ModelAdmin):
         "user",
         "author",
     )
+    list_select_related = ("user", "author")
+    search_fields = ("user__username", "author__username")
+    autocomplete_fields = ("user", "author")
+    show_full_result_count = False
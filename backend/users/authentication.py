@@ -0,0 +1,58 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+AUTH_TOKEN_CACHE_KEY = "auth_token:{}"
+
+User = get_user_model()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        cache_key = self.get_cache_key(key)
+        cached = cache.get(cache_key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(
+                cache_key,
+                (
+                    token.created,
+                    [getattr(user, field) for field in self.get_user_fields()],
+                ),
+                settings.AUTH_TOKEN_CACHE_TIMEOUT,
+            )
+            return user, token
+        created, values = cached
+        user = User.from_db(User.objects.db, self.get_user_fields(), values)
+        if not user.is_active:
+            raise AuthenticationFailed(_("User inactive or deleted."))
+        token = self.get_model().from_db(
+            self.get_model().objects.db,
+            ("key", "user_id", "created"),
+            (key, user.pk, created),
+        )
+        token.user = user
+        return user, token
+
+    @staticmethod
+    def get_user_fields():
+        return [
+            field.attname
+            for field in User._meta.concrete_fields
+            if field.name not in User.counter_fields
+        ]
+
+    @staticmethod
+    def get_cache_key(key):
+        return AUTH_TOKEN_CACHE_KEY.format(
+            hashlib.sha256(key.encode()).hexdigest()
+        )
+
+    @classmethod
+    def invalidate(cls, keys):
+        cache.delete_many([cls.get_cache_key(key) for key in keys])
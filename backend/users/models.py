@@ -1,8 +1,28 @@
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.core.cache import cache
 from django.db import models
 
+SUBSCRIBED_AUTHORS_CACHE_KEY = "subscribed_authors:{}"
 
-class User(AbstractUser):
+
+class CounterFieldsMixin:
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            excluded = set(self.counter_fields) | self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in excluded
+                and field.attname not in excluded
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(CounterFieldsMixin, AbstractUser):
     email = models.EmailField(
         verbose_name="Адрес электронной почты",
         max_length=254,
@@ -21,6 +41,14 @@ class User(AbstractUser):
     last_name = models.CharField(
         verbose_name="Фамилия", max_length=32, help_text="Укажите Фамилию"
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name="Количество рецептов", default=0, editable=False
+    )
+    subscribers_count = models.PositiveIntegerField(
+        verbose_name="Количество подписчиков", default=0, editable=False
+    )
+
+    counter_fields = ("recipes_count", "subscribers_count")
 
     class Meta:
         ordering = ("username",)
@@ -55,3 +83,22 @@ class Subscriptions(models.Model):
                 fields=("author", "user"), name="unique_subscription"
             )
         ]
+
+    @classmethod
+    def get_author_ids(cls, user):
+        key = SUBSCRIBED_AUTHORS_CACHE_KEY.format(user.pk)
+        author_ids = cache.get(key)
+        if author_ids is None:
+            author_ids = frozenset(
+                cls.objects.filter(user=user).values_list(
+                    "author_id", flat=True
+                )
+            )
+            cache.set(
+                key, author_ids, settings.SUBSCRIBED_AUTHORS_CACHE_TIMEOUT
+            )
+        return author_ids
+
+    @staticmethod
+    def invalidate_author_ids(user_id):
+        cache.delete(SUBSCRIBED_AUTHORS_CACHE_KEY.format(user_id))
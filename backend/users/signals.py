@@ -0,0 +1,26 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import CachedTokenAuthentication
+from .models import Subscriptions, User
+
+
+@receiver(post_save, sender=Subscriptions)
+@receiver(post_delete, sender=Subscriptions)
+def reset_subscribed_authors(sender, instance, **kwargs):
+    Subscriptions.invalidate_author_ids(instance.user_id)
+
+
+@receiver(post_delete, sender=Token)
+def reset_cached_token(sender, instance, **kwargs):
+    CachedTokenAuthentication.invalidate((instance.key,))
+
+
+@receiver(post_save, sender=User)
+def reset_cached_tokens(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    CachedTokenAuthentication.invalidate(
+        Token.objects.filter(user=instance).values_list("key", flat=True)
+    )